@@ -1,4 +1,10 @@
+import re
+
 books = []
+word_index = {}  # word -> {isbn: book} for every book whose title or author has that word
+
+def _words(book):
+    return set(re.findall(r"\w+", f"{book['title']} {book['author']}".lower()))
 
 def add_book(title, author, year, isbn):
     book = {
@@ -8,6 +14,8 @@ def add_book(title, author, year, isbn):
         "isbn": isbn
     }
     books.append(book)
+    for word in _words(book):
+        word_index.setdefault(word, {})[isbn] = book
 
 def display_books():
     for book in books:
@@ -22,6 +30,25 @@ def search_books(query):
             results.append(book)
     return results
 
+def search_words(query, match_all=True):
+    """Search titles and authors by whole words with the word index.
+
+    With match_all, returns the books that have every query word, in the order they were added;
+    otherwise returns the books that have any of them, most matched words first.
+    """
+    postings = [word_index.get(word, {}) for word in set(re.findall(r"\w+", query.lower()))]
+    if not postings:
+        return []
+    if match_all:
+        postings.sort(key=len)
+        return [book for isbn, book in postings[0].items() if all(isbn in p for p in postings[1:])]
+    matches = {}
+    for posting in postings:
+        for isbn, book in posting.items():
+            count, _ = matches.get(isbn, (0, book))
+            matches[isbn] = (count + 1, book)
+    return [book for count, book in sorted(matches.values(), key=lambda m: -m[0])]
+
 def get_book(isbn):
     """Get a specific book by ISBN"""
     for book in books:
@@ -34,6 +61,12 @@ def delete_book(book_id):
   for book in books:
     if book["id"] == book_id:
       books.remove(book)
+      for word in _words(book):
+        postings = word_index.get(word)
+        if postings is not None:
+          postings.pop(book["isbn"], None)
+          if not postings:
+            del word_index[word]
       return True
   return False
 
@@ -1,3 +1,5 @@
+from search_index import InvertedIndex, TrigramIndex
+
 
 class Library:
     """
@@ -16,8 +18,11 @@ class Library:
     """
 
     def __init__(self):
-        """Initialize an empty library."""
+        """Initialize an empty library with ISBN and word indexes."""
         self._books = []
+        self._by_isbn = {}
+        self._index = InvertedIndex()
+        self._trigrams = TrigramIndex()
 
     @property
     def books(self):
@@ -42,10 +47,10 @@ class Library:
             raise ValueError("Title, author, ISBN, and genre must be non-empty strings.")
         if not isinstance(year, int) or not (1000 <= year <= 2100):
             raise ValueError("Year must be an integer between 1000 and 2100.")
-        if any(b['isbn'] == isbn for b in self._books):
+        if isbn in self._by_isbn:
             raise ValueError(f"Book with ISBN {isbn} already exists.")
 
-        self._books.append({
+        book = {
             "title": title.strip(),
             "author": author.strip(),
             "isbn": isbn.strip(),
@@ -53,19 +58,65 @@ class Library:
             "genre": genre.strip(),
             "available": True,
             "rating": None
-        })
+        }
+        self._books.append(book)
+        self._by_isbn[book['isbn']] = book
+        self._index.add(book['isbn'], book)
+        self._trigrams.add(book['isbn'], book)
 
     def search_books(self, query):
-        """Return books where query matches title or author (case-insensitive)."""
+        """
+        Return books where query matches title or author (case-insensitive).
+
+        A trigram index narrows the books to check; each one is still
+        confirmed with the substring test, so mid-word matches keep working.
+        A book whose title or author is edited in place is only found under
+        its new text after reindex_book is called for it.
+
+        Examples:
+            >>> lib = Library()
+            >>> lib.add_book("1984", "George Orwell", "9780451524935", 1949, "Dystopian")
+            >>> [b['title'] for b in lib.search_books("rwel")]
+            ['1984']
+        """
         query = query.lower()
-        return [b for b in self._books if query in b['title'].lower() or query in b['author'].lower()]
+        keys = self._trigrams.candidates(query)
+        candidates = self._books if keys is None else (self._by_isbn[key] for key in keys)
+        return [b for b in candidates if query in b['title'].lower() or query in b['author'].lower()]
+
+    def search(self, query, mode="and", limit=None):
+        """
+        Return books whose title or author contain the query words, best match first.
+
+        Words are looked up in an inverted index, so no book list scan is needed.
+        mode="and" requires every word, mode="or" accepts any of them.
+
+        Examples:
+            >>> lib = Library()
+            >>> lib.add_book("1984", "George Orwell", "9780451524935", 1949, "Dystopian")
+            >>> lib.add_book("Animal Farm", "George Orwell", "9780451526342", 1945, "Satire")
+            >>> [b['title'] for b in lib.search("george farm")]
+            ['Animal Farm']
+        """
+        return [self._by_isbn[isbn] for isbn in self._index.search(query, mode, limit)]
+
+    def reindex_book(self, isbn):
+        """Refresh the word index after a book's title or author was edited."""
+        book = self._by_isbn.get(isbn)
+        if book is None:
+            return False
+        self._index.add(isbn, book)
+        self._trigrams.add(isbn, book)
+        return True
 
     def get_book(self, isbn):
-        """Return book by ISBN or None if not found."""
-        for b in self._books:
-            if b['isbn'] == isbn:
-                return b
-        return None
+        """
+        Return book by ISBN or None if not found.
+
+        The returned dictionary is the library's own record. After editing its
+        title or author, call reindex_book, or the searches keep using the old text.
+        """
+        return self._by_isbn.get(isbn)
 
     def __str__(self):
         return f"Library with {len(self._books)} books"
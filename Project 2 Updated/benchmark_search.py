@@ -0,0 +1,76 @@
+"""
+Benchmark: a linear title/author scan against the indexed searches.
+
+search_books (trigram-narrowed substring search) must return exactly what
+the linear scan returns; search is the ranked word search.
+
+Run from this folder:
+
+    python benchmark_search.py            # 100k and 1M books
+    python benchmark_search.py 50000      # custom sizes
+"""
+
+import random
+import sys
+import time
+
+from class_1_inst_326_project_2_jason import Library
+
+SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "vor", "shi", "dal", "quin", "bre", "tho", "zu"]
+
+
+def make_words(rng, count):
+    """Build a deterministic vocabulary of made-up words."""
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def build_library(size, seed=326):
+    rng = random.Random(seed)
+    vocabulary = make_words(rng, 20000)
+    surnames = make_words(rng, 5000)
+    library = Library()
+    for i in range(size):
+        title = " ".join(rng.choice(vocabulary).capitalize() for _ in range(rng.randint(1, 5)))
+        author = f"{rng.choice(surnames).capitalize()} {rng.choice(surnames).capitalize()}"
+        library.add_book(title, author, 1000 + i % 1000, f"isbn-{i}")
+    return library, rng.sample(vocabulary, 50)
+
+
+def linear_search(library, query):
+    """The search_books scan as it was before the trigram index."""
+    query = query.lower().strip()
+    return [b for b in library.books if query in b["title"].lower() or query in b["author"].lower()]
+
+
+def time_queries(search, queries):
+    start = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main(sizes):
+    print(f"{'books':>10} {'build s':>9} {'scan ms':>9} {'search_books ms':>16} {'search ms':>10} {'search OR ms':>13}")
+    for size in sizes:
+        start = time.perf_counter()
+        library, words = build_library(size)
+        build = time.perf_counter() - start
+
+        # Whole words, mid-word fragments and short queries.
+        substrings = words[:20] + [word[1:5] for word in words[20:40]] + [word[:2] for word in words[40:]]
+        for query in substrings:
+            assert library.search_books(query) == linear_search(library, query), query
+
+        pairs = [f"{a} {b}" for a, b in zip(words[::2], words[1::2])]
+        linear = time_queries(lambda q: linear_search(library, q), substrings)
+        trigram = time_queries(library.search_books, substrings)
+        indexed = time_queries(library.search, words)
+        indexed_or = time_queries(lambda q: library.search(q, mode="or", limit=20), pairs)
+        print(f"{size:>10,} {build:>9.2f} {linear:>9.2f} {trigram:>16.2f} {indexed:>10.3f} {indexed_or:>13.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000])
@@ -1,3 +1,6 @@
+from search_index import InvertedIndex, TrigramIndex
+
+
 
 
 class Library:
@@ -26,9 +29,13 @@ class Library:
         Initialize a new Library instance with an empty book catalog.
 
         The books list is stored as a private attribute to encourage
-        controlled access through class methods.
+        controlled access through class methods. Books are also indexed by
+        ISBN and by the words of their title and author.
         """
         self._books = []
+        self._by_isbn = {}
+        self._index = InvertedIndex()
+        self._trigrams = TrigramIndex()
 
     @property
     def books(self):
@@ -116,6 +123,9 @@ class Library:
             "isbn": isbn.strip()
         }
         self._books.append(book)
+        self._by_isbn[book["isbn"]] = book
+        self._index.add(book["isbn"], book)
+        self._trigrams.add(book["isbn"], book)
 
     def display_books(self):
         """
@@ -143,6 +153,10 @@ class Library:
         """
         Search for books by title or author (case-insensitive).
 
+        Results come from the search indexes. A book whose title or author
+        is edited in place (e.g. through get_book) is only found under its
+        new text after reindex_book is called for it.
+
         Args:
             query (str): The search term to match against titles and authors.
 
@@ -165,6 +179,8 @@ class Library:
             '1984'
             >>> library.search_books("nonexistent")
             []
+            >>> [book['title'] for book in library.search_books("rwel")]
+            ['1984', 'Animal Farm']
         """
         if not isinstance(query, str) or not query.strip():
             raise ValueError("Query must be a non-empty string")
@@ -172,16 +188,83 @@ class Library:
         query = query.lower().strip()
         results = []
 
-        for book in self._books:
+        # The trigram index narrows the scan to books that can contain the
+        # query; the substring test below still decides every match.
+        keys = self._trigrams.candidates(query)
+        candidates = self._books if keys is None else (self._by_isbn[key] for key in keys)
+
+        for book in candidates:
             if query in book["title"].lower() or query in book["author"].lower():
                 results.append(book)
 
         return results
 
+    def search(self, query, mode="and", limit=None):
+        """
+        Search titles and authors by whole words, best matches first.
+
+        Unlike search_books, this looks words up in an inverted index instead
+        of scanning every book, so its cost does not grow with the catalog.
+
+        Args:
+            query (str): One or more words to match against titles and authors.
+            mode (str): "and" requires every word, "or" accepts any of them.
+            limit (int, optional): Return at most this many books.
+
+        Returns:
+            list: Matching book dictionaries, ranked by relevance.
+
+        Raises:
+            ValueError: If query is not a string or is empty, or mode is invalid.
+
+        Examples:
+            >>> library = Library()
+            >>> library.add_book("1984", "George Orwell", 1949, "978-0451524935")
+            >>> library.add_book("Animal Farm", "George Orwell", 1945, "978-0451526342")
+            >>> [book['title'] for book in library.search("orwell farm")]
+            ['Animal Farm']
+            >>> [book['title'] for book in library.search("1984 farm", mode="or")]
+            ['1984', 'Animal Farm']
+        """
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("Query must be a non-empty string")
+
+        return [self._by_isbn[isbn] for isbn in self._index.search(query, mode, limit)]
+
+    def reindex_book(self, isbn):
+        """
+        Refresh the search index after a book's title or author was edited.
+
+        Args:
+            isbn (str): The ISBN of the edited book.
+
+        Returns:
+            bool: True if the book exists and was reindexed, False otherwise.
+
+        Examples:
+            >>> library = Library()
+            >>> library.add_book("1984", "George Orwell", 1949, "978-0451524935")
+            >>> library.get_book("978-0451524935")["title"] = "Nineteen Eighty-Four"
+            >>> library.reindex_book("978-0451524935")
+            True
+            >>> [book['year'] for book in library.search("eighty")]
+            [1949]
+        """
+        book = self._by_isbn.get(isbn)
+        if book is None:
+            return False
+        self._index.add(isbn, book)
+        self._trigrams.add(isbn, book)
+        return True
+
     def get_book(self, isbn):
         """
         Get a specific book by its ISBN.
 
+        The returned dictionary is the catalog's own record. After editing
+        its title or author, call reindex_book, or search_books and search
+        keep finding it under the old text.
+
         Args:
             isbn (str): The ISBN of the book to retrieve.
 
@@ -203,13 +286,7 @@ class Library:
         if not isinstance(isbn, str) or not isbn.strip():
             raise ValueError("ISBN must be a non-empty string")
 
-        isbn = isbn.strip()
-
-        for book in self._books:
-            if book["isbn"] == isbn:
-                return book
-
-        return None
+        return self._by_isbn.get(isbn.strip())
 
     def delete_book(self, isbn):
         """
@@ -240,14 +317,14 @@ class Library:
         if not isinstance(isbn, str) or not isbn.strip():
             raise ValueError("ISBN must be a non-empty string")
 
-        isbn = isbn.strip()
-
-        for book in self._books:
-            if book["isbn"] == isbn:
-                self._books.remove(book)
-                return True
+        book = self._by_isbn.pop(isbn.strip(), None)
+        if book is None:
+            return False
 
-        return False
+        self._books.remove(book)
+        self._index.remove(book["isbn"])
+        self._trigrams.remove(book["isbn"])
+        return True
 
     def __str__(self):
         """
@@ -0,0 +1,238 @@
+"""
+Search indexes shared by the Library classes in this folder.
+
+Books are stored as dictionaries, so the indexes only keep a key (the ISBN)
+in their posting lists and leave the book records to the Library.
+"""
+
+import heapq
+import itertools
+import math
+import re
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Split text into casefolded word tokens.
+
+    Examples:
+        >>> tokenize("The Hobbit, or There and Back Again")
+        ['the', 'hobbit', 'or', 'there', 'and', 'back', 'again']
+    """
+    return _TOKEN_PATTERN.findall(text.casefold())
+
+
+class InvertedIndex:
+    """
+    A tokenized inverted index over selected text fields of book records.
+
+    Each token maps to a posting list of {key: weight}, where the weight is
+    the field-weighted number of times the token appears in that record.
+    Titles count more than authors when ranking results.
+
+    Examples:
+        >>> index = InvertedIndex()
+        >>> index.add("1", {"title": "1984", "author": "George Orwell"})
+        >>> index.add("2", {"title": "Animal Farm", "author": "George Orwell"})
+        >>> index.add("3", {"title": "Orwell: A Life", "author": "Bernard Crick"})
+        >>> index.search("orwell")
+        ['3', '1', '2']
+        >>> index.search("orwell farm")
+        ['2']
+        >>> index.search("farm crick", mode="or")
+        ['2', '3']
+    """
+
+    FIELD_WEIGHTS = {"title": 2.0, "author": 1.0}
+
+    def __init__(self, field_weights=None):
+        self._field_weights = dict(field_weights or self.FIELD_WEIGHTS)
+        self._postings = {}
+        self._doc_terms = {}
+        self._order = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def add(self, key, record):
+        """
+        Index a record under key, replacing any previous entry for that key.
+
+        Args:
+            key (str): Unique identifier of the record (the ISBN).
+            record (dict): The record whose text fields are indexed.
+        """
+        # A record that is indexed again keeps its place in the tie order.
+        order = self._order.get(key)
+        if order is not None:
+            self.remove(key)
+
+        terms = {}
+        for field, weight in self._field_weights.items():
+            for token in tokenize(record.get(field) or ""):
+                terms[token] = terms.get(token, 0.0) + weight
+
+        self._doc_terms[key] = terms
+        self._order[key] = next(self._counter) if order is None else order
+        for token, weight in terms.items():
+            self._postings.setdefault(token, {})[key] = weight
+
+    def remove(self, key):
+        """Remove a record from the index. Unknown keys are ignored."""
+        terms = self._doc_terms.pop(key, None)
+        if terms is None:
+            return
+        del self._order[key]
+        for token in terms:
+            posting = self._postings[token]
+            del posting[key]
+            if not posting:
+                del self._postings[token]
+
+    def search(self, query, mode="and", limit=None):
+        """
+        Return keys of records matching the query words, best match first.
+
+        Args:
+            query (str): One or more words to look for.
+            mode (str): "and" requires every word, "or" accepts any word.
+            limit (int, optional): Return at most this many keys.
+
+        Returns:
+            list: Matching keys ranked by a TF-IDF score.
+
+        Raises:
+            ValueError: If mode is not "and" or "or".
+        """
+        if mode not in ("and", "or"):
+            raise ValueError("mode must be 'and' or 'or'")
+
+        tokens = set(tokenize(query))
+        postings = [self._postings.get(token, {}) for token in tokens]
+        if not postings:
+            return []
+
+        if mode == "and":
+            postings.sort(key=len)
+            if not postings[0]:
+                return []
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return []
+        else:
+            candidates = set().union(*postings)
+
+        total = len(self._doc_terms)
+        idfs = [(posting, math.log(1 + total / len(posting))) for posting in postings if posting]
+        scores = {key: sum(posting.get(key, 0.0) * idf for posting, idf in idfs) for key in candidates}
+
+        # Equal scores keep the order in which the records were added.
+        def rank(key):
+            return (-scores[key], self._order[key])
+
+        if limit is not None:
+            return heapq.nsmallest(limit, scores, key=rank)
+        return sorted(scores, key=rank)
+
+
+def trigrams(text):
+    """
+    Return the set of three-character substrings of text.
+
+    Examples:
+        >>> sorted(trigrams("orwell"))
+        ['ell', 'orw', 'rwe', 'wel']
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    A trigram index that narrows substring searches over text fields.
+
+    Each field is lowercased (the same normalization search_books applies)
+    and split into overlapping three-character trigrams. A record can only
+    contain a query as a substring if it contains every trigram of the
+    query, so intersecting the posting sets gives a small candidate list.
+    Callers must still confirm each candidate with the exact substring test.
+
+    Examples:
+        >>> index = TrigramIndex()
+        >>> index.add("1", {"title": "1984", "author": "George Orwell"})
+        >>> index.add("2", {"title": "Animal Farm", "author": "George Orwell"})
+        >>> index.add("3", {"title": "Brave New World", "author": "Aldous Huxley"})
+        >>> index.candidates("rwel")
+        ['1', '2']
+        >>> index.candidates("ge") is None
+        True
+        >>> index.add("1", {"title": "Nineteen Eighty-Four", "author": "George Orwell"})
+        >>> index.candidates("rwel")
+        ['1', '2']
+    """
+
+    FIELDS = ("title", "author")
+
+    def __init__(self, fields=None):
+        self._fields = tuple(fields or self.FIELDS)
+        self._postings = {}
+        self._doc_grams = {}
+        self._order = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._doc_grams)
+
+    def add(self, key, record):
+        """Index a record under key, replacing any previous entry for that key but keeping its place."""
+        order = self._order.get(key)
+        if order is not None:
+            self.remove(key)
+
+        grams = set()
+        for field in self._fields:
+            grams |= trigrams((record.get(field) or "").lower())
+
+        self._doc_grams[key] = grams
+        self._order[key] = next(self._counter) if order is None else order
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        """Remove a record from the index. Unknown keys are ignored."""
+        grams = self._doc_grams.pop(key, None)
+        if grams is None:
+            return
+        del self._order[key]
+        for gram in grams:
+            posting = self._postings[gram]
+            posting.discard(key)
+            if not posting:
+                del self._postings[gram]
+
+    def candidates(self, query):
+        """
+        Return keys that may contain the lowercased query, in insertion order.
+
+        Args:
+            query (str): An already lowercased substring query.
+
+        Returns:
+            list or None: Candidate keys, or None when the query is shorter
+            than three characters and cannot be narrowed down.
+        """
+        grams = trigrams(query)
+        if not grams:
+            return None
+
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            if not matches:
+                break
+            matches &= posting
+        return sorted(matches, key=self._order.__getitem__)
@@ -0,0 +1,816 @@
+"""Benchmarks for the library system.
+
+Run from the ``Project 4`` folder, for example:
+
+    python benchmarks.py memory --items 1000000
+
+The ``suite`` benchmark times the main operations across catalog sizes and
+can check the results against an earlier run:
+
+    python benchmarks.py suite --output data/baseline.json
+    python benchmarks.py suite --baseline data/baseline.json --threshold 0.2
+"""
+import argparse
+import contextlib
+import csv
+import gc
+import random
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+from library_model import LibraryCatalog, LoanManager, Book, DVD, EBook, LibraryItem, ITEM_CLASS_MAP
+from persistence_manager import PersistenceManager
+from lazy_catalog import LazyCatalog
+from main_cli import LibraryCLI, LIST_PAGE_SIZE, STARTUP_TARGET_SECONDS
+from metrics import Metrics
+import binary_state
+import workload
+
+GENRES = ["Fiction", "SciFi", "Mystery", "History", "Biography", "Fantasy", "Romance", "Poetry"]
+
+
+def iter_items(count: int, item_classes=(Book, DVD, EBook)) -> Iterator[LibraryItem]:
+    """Yields a deterministic mix of items (70% books, 15% DVDs, 15% e-books, as in production)."""
+    book_cls, dvd_cls, ebook_cls = item_classes
+    for i in range(count):
+        title = f"Title {i}"
+        isbn = f"{i:013d}"
+        year = 1900 + i % 125
+        kind = i % 20
+        if kind < 14:
+            yield book_cls(title, isbn, year, f"Author {i % 50000}", GENRES[i % len(GENRES)])
+        elif kind < 17:
+            yield dvd_cls(title, isbn, year, f"Director {i % 5000}")
+        else:
+            yield ebook_cls(title, isbn, year, f"Author {i % 50000}", float(i % 100) / 10)
+
+
+def make_items(count: int, item_classes=(Book, DVD, EBook)) -> List[LibraryItem]:
+    return list(iter_items(count, item_classes))
+
+
+# The item layout used before LibraryItem switched to __slots__: one __dict__ per instance.
+class _DictBook:
+    def __init__(self, title, isbn, year, author, genre, available=True):
+        self.title = title
+        self.isbn = isbn
+        self.year = year
+        self.available = available
+        self.author = author
+        self.genre = genre
+
+
+class _DictDVD:
+    def __init__(self, title, isbn, year, director, available=True):
+        self.title = title
+        self.isbn = isbn
+        self.year = year
+        self.available = available
+        self.director = director
+
+
+class _DictEBook:
+    def __init__(self, title, isbn, year, author, file_size, available=True):
+        self.title = title
+        self.isbn = isbn
+        self.year = year
+        self.available = available
+        self.author = author
+        self.file_size = file_size
+
+
+def _catalog_bytes(count: int, item_classes) -> int:
+    gc.collect()
+    tracemalloc.start()
+    catalog = LibraryCatalog()
+    for item in make_items(count, item_classes):
+        catalog._items[item.isbn] = item
+    used, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del catalog
+    return used
+
+
+def bench_memory(count: int) -> Dict[str, float]:
+    """Compares catalog bytes per item for the __dict__ and __slots__ layouts."""
+    before = _catalog_bytes(count, (_DictBook, _DictDVD, _DictEBook))
+    after = _catalog_bytes(count, (Book, DVD, EBook))
+    return {
+        "items": count,
+        "dict_bytes_per_item": before / count,
+        "slots_bytes_per_item": after / count,
+        "saved_percent": 100.0 * (before - after) / before,
+    }
+
+
+def _loan_setup(count: int):
+    catalog = LibraryCatalog()
+    for item in make_items(count):
+        catalog.add_item(item)
+    return LoanManager(catalog), [f"User {i % 1000}" for i in range(count)], [f"{i:013d}" for i in range(count)]
+
+
+def bench_loans(count: int) -> Dict[str, float]:
+    """Compares checkout_item/return_item in a loop against checkout_many/return_many."""
+    loans, users, isbns = _loan_setup(count)
+    start = time.perf_counter()
+    for user, isbn in zip(users, isbns):
+        loans.checkout_item(user, isbn)
+    for i, isbn in enumerate(isbns):
+        loans.return_item(isbn, days_late=i % 7)
+    single = time.perf_counter() - start
+
+    loans, users, isbns = _loan_setup(count)
+    start = time.perf_counter()
+    loans.checkout_many(zip(users, isbns))
+    loans.return_many((isbn, i % 7) for i, isbn in enumerate(isbns))
+    batch = time.perf_counter() - start
+
+    return {
+        "transactions": 2 * count,
+        "single_seconds": single,
+        "batch_seconds": batch,
+        "speedup": single / batch,
+    }
+
+
+def bench_threads(count: int, max_threads: int) -> Dict[str, float]:
+    """Checkout/return throughput of a thread-safe LoanManager as desk threads are added."""
+    result: Dict[str, float] = {"transactions": 2 * count}
+    threads = 1
+    while threads <= max_threads:
+        catalog = LibraryCatalog(thread_safe=True)
+        for item in make_items(count):
+            catalog.add_item(item)
+        loans = LoanManager(catalog)
+        isbns = [f"{i:013d}" for i in range(count)]
+
+        def desk(n):
+            for isbn in isbns[n::threads]:
+                loans.checkout_item(f"Desk {n}", isbn)
+                loans.return_item(isbn)
+
+        workers = [threading.Thread(target=desk, args=(n,)) for n in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        result[f"tx_per_second_{threads}_threads"] = 2 * count / (time.perf_counter() - start)
+        threads *= 2
+    return result
+
+
+def bench_save(count: int, changes: int) -> Dict[str, float]:
+    """Time and bytes to persist a few checkouts: full JSON rewrite vs delta file vs journal append + fsync."""
+    catalog = LibraryCatalog()
+    for item in make_items(count):
+        catalog.add_item(item)
+    loans = LoanManager(catalog)
+    isbns = [f"{i:013d}" for i in range(changes)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full = PersistenceManager(catalog, loans)
+        full.STATE_FILE = Path(tmp) / "state.json"
+        start = time.perf_counter()
+        for isbn in isbns:
+            loans.checkout_item("Bench User", isbn)
+            full._write_snapshot()
+        full_seconds = (time.perf_counter() - start) / changes
+        full_bytes = full.last_save["bytes"]
+        loans.return_many((isbn, 0) for isbn in isbns)
+
+        delta = PersistenceManager(catalog, loans, delta_saves=True)
+        delta.STATE_FILE = Path(tmp) / "delta_base.json"
+        delta.DELTA_FILE = Path(tmp) / "state.delta"
+        delta.save_state()
+        start = time.perf_counter()
+        for isbn in isbns:
+            loans.checkout_item("Bench User", isbn)
+            delta.save_state()
+        delta_seconds = (time.perf_counter() - start) / changes
+        delta_last = delta.last_save
+        delta.unwatch(delta._changes)
+        loans.return_many((isbn, 0) for isbn in isbns)
+
+        journaled = PersistenceManager(catalog, loans, journal=True)
+        journaled.JOURNAL_FILE = Path(tmp) / "state.journal"
+        start = time.perf_counter()
+        for isbn in isbns:
+            loans.checkout_item("Bench User", isbn)
+            journaled.save_state()
+        journal_seconds = (time.perf_counter() - start) / changes
+        journaled.close()
+
+    return {
+        "items": count,
+        "full_rewrite_ms_per_save": 1000 * full_seconds,
+        "full_rewrite_bytes": full_bytes,
+        "delta_ms_per_save": 1000 * delta_seconds,
+        "delta_last_bytes": delta_last["bytes"],
+        "delta_last_records": delta_last["records"],
+        "journal_ms_per_save": 1000 * journal_seconds,
+    }
+
+
+def bench_compaction(count: int) -> Dict[str, float]:
+    """Checkpoint timings at `count` items, with a desk thread checking items out meanwhile."""
+    catalog = LibraryCatalog(thread_safe=True)
+    for item in make_items(count):
+        catalog.add_item(item)
+    loans = LoanManager(catalog)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        persistence = PersistenceManager(catalog, loans, journal=True)
+        persistence.STATE_FILE = Path(tmp) / "state.json"
+        persistence.JOURNAL_FILE = Path(tmp) / "state.journal"
+
+        stop = threading.Event()
+        latencies: List[float] = []
+
+        def desk():
+            i = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                loans.checkout_item("Bench User", f"{i:013d}")
+                latencies.append(time.perf_counter() - start)
+                i += 1
+
+        worker = threading.Thread(target=desk)
+        worker.start()
+        persistence.checkpoint()
+        stop.set()
+        worker.join()
+        persistence.close()
+        snapshot_mb = persistence.STATE_FILE.stat().st_size / 1e6
+
+    result: Dict[str, float] = dict(persistence.last_checkpoint)
+    result.update({
+        "snapshot_mb": snapshot_mb,
+        "checkouts_during_checkpoint": len(latencies),
+        "max_checkout_ms": 1000 * max(latencies, default=0.0),
+    })
+    return result
+
+
+def _json_load_all(path: Path, catalog: LibraryCatalog, loans: LoanManager):
+    """The load path used before streaming: parse the whole file, then build the items."""
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    for item_data in state["catalog_items"]:
+        catalog.add_item(ITEM_CLASS_MAP[item_data["type"]].from_dict(item_data))
+    loans.load_checkouts_from_dict(state["checkouts"])
+
+
+def _measure_load(path: Path, load: Callable) -> Dict[str, float]:
+    catalog = LibraryCatalog()
+    loans = LoanManager(catalog)
+    first_item: List[float] = []
+    catalog.add_listener(lambda event, isbn: first_item or first_item.append(time.perf_counter()))
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    load(catalog, loans)
+    seconds = time.perf_counter() - start
+    used, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "first_item_ms": 1000 * (first_item[0] - start),
+            "final_mb": used / 1e6, "peak_mb": peak / 1e6}
+
+
+def bench_load(count: int) -> Dict[str, float]:
+    """Peak memory and time-to-first-item of the streaming load_state against json.load."""
+    catalog = LibraryCatalog()
+    for item in make_items(count):
+        catalog.add_item(item)
+    result: Dict[str, float] = {"items": count}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        persistence = PersistenceManager(catalog, LoanManager(catalog))
+        persistence.STATE_FILE = Path(tmp) / "state.json"
+        persistence._write_snapshot()
+        del catalog, persistence
+
+        def streaming(catalog, loans):
+            loader = PersistenceManager(catalog, loans)
+            loader.STATE_FILE = Path(tmp) / "state.json"
+            loader.load_state()
+
+        for label, load in (("json_load", lambda c, l: _json_load_all(Path(tmp) / "state.json", c, l)),
+                            ("streaming", streaming)):
+            for key, value in _measure_load(Path(tmp) / "state.json", load).items():
+                result[f"{label}_{key}"] = value
+    return result
+
+
+def bench_lazy(count: int) -> Dict[str, float]:
+    """Cold start time and resident memory of load_state, built items vs LazyCatalog."""
+    catalog = LibraryCatalog()
+    catalog.add_many(make_items(count))
+    result: Dict[str, float] = {"items": count}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        persistence = PersistenceManager(catalog, LoanManager(catalog))
+        persistence.STATE_FILE = Path(tmp) / "state.json"
+        persistence._write_snapshot()
+        del catalog, persistence
+
+        isbns = [f"{random.randrange(count):013d}" for _ in range(1000)]
+        def load(catalog_cls) -> LibraryCatalog:
+            catalog = catalog_cls()
+            loader = PersistenceManager(catalog, LoanManager(catalog))
+            loader.STATE_FILE = Path(tmp) / "state.json"
+            loader.load_state()
+            return catalog
+
+        for label, catalog_cls in (("eager", LibraryCatalog), ("lazy", LazyCatalog)):
+            # Timed and traced in separate runs: tracemalloc slows the allocations down a lot.
+            gc.collect()
+            start = time.perf_counter()
+            catalog = load(catalog_cls)
+            result[f"{label}_load_seconds"] = time.perf_counter() - start
+            start = time.perf_counter()
+            for isbn in isbns:
+                catalog.get_item(isbn)
+            result[f"{label}_get_item_us"] = 1e6 * (time.perf_counter() - start) / len(isbns)
+            del catalog
+
+            gc.collect()
+            tracemalloc.start()
+            catalog = load(catalog_cls)
+            result[f"{label}_resident_mb"] = tracemalloc.get_traced_memory()[0] / 1e6
+            tracemalloc.stop()
+            del catalog
+    return result
+
+
+def bench_list(count: int) -> Dict[str, float]:
+    """Time and memory to produce the first page of a listing, whole-catalog copy vs cursor."""
+    catalog = LibraryCatalog()
+    catalog.add_many(make_items(count))
+    result: Dict[str, float] = {"items": count}
+
+    def copied_page():
+        # What list_items did before: copy the catalog, then format every item.
+        return [f"- {item}" for item in catalog.all_items][:LIST_PAGE_SIZE]
+
+    def cursor_page():
+        return [f"- {item}" for item in catalog.cursor(item_type="DVD", available=True).next_page(LIST_PAGE_SIZE)]
+
+    for label, page in (("copy", copied_page), ("cursor", cursor_page)):
+        start = time.perf_counter()
+        page()
+        result[f"{label}_first_page_ms"] = 1000 * (time.perf_counter() - start)
+        tracemalloc.start()
+        page()
+        result[f"{label}_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result
+
+
+def bench_startup(count: int) -> Dict[str, float]:
+    """Time from LibraryCLI() to the menu, loading synchronously vs in the background (--instant)."""
+    catalog = LibraryCatalog()
+    catalog.add_many(make_items(count))
+    result: Dict[str, float] = {"items": count, "target_ms": 1000 * STARTUP_TARGET_SECONDS}
+    default_state_file = PersistenceManager.STATE_FILE
+
+    with tempfile.TemporaryDirectory() as tmp:
+        persistence = PersistenceManager(catalog, LoanManager(catalog))
+        persistence.STATE_FILE = Path(tmp) / "state.json"
+        persistence._write_snapshot()
+        del catalog, persistence
+        try:
+            PersistenceManager.STATE_FILE = Path(tmp) / "state.json"
+            gc.collect()
+            start = time.perf_counter()
+            LibraryCLI()
+            result["sync_menu_ms"] = 1000 * (time.perf_counter() - start)
+
+            gc.collect()
+            start = time.perf_counter()
+            cli = LibraryCLI(instant=True)
+            result["instant_menu_ms"] = 1000 * (time.perf_counter() - start)
+            cli.loader.wait(f"{count // 100:013d}")
+            result["instant_first_1pct_item_ms"] = 1000 * (time.perf_counter() - start)
+            cli.loader.wait()
+            result["instant_full_load_ms"] = 1000 * (time.perf_counter() - start)
+        finally:
+            PersistenceManager.STATE_FILE = default_state_file
+    return result
+
+
+def bench_batch(count: int) -> Dict[str, float]:
+    """Transactions per second through LibraryCLI.run_batch: `count` checkouts, then `count` returns."""
+    catalog = LibraryCatalog()
+    catalog.add_many(make_items(count))
+    default_state_file = PersistenceManager.STATE_FILE
+
+    with tempfile.TemporaryDirectory() as tmp:
+        persistence = PersistenceManager(catalog, LoanManager(catalog))
+        persistence.STATE_FILE = Path(tmp) / "state.json"
+        persistence._write_snapshot()
+        del catalog, persistence
+        script = [f"checkout {i:013d} user{i % 5000}" for i in range(count)]
+        script += [f"return {i:013d} {i % 3}" for i in range(count)]
+        try:
+            PersistenceManager.STATE_FILE = Path(tmp) / "state.json"
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                cli = LibraryCLI()
+                summary = cli.run_batch(script, devnull)
+        finally:
+            PersistenceManager.STATE_FILE = default_state_file
+
+    return {"transactions": summary["commands"], "failed": summary["failed"],
+            "seconds_with_save": summary["seconds"],
+            "transactions_per_sec": round(summary["commands"] / summary["seconds"])}
+
+
+def bench_binary(count: int) -> Dict[str, float]:
+    """Writes `count` items in the binary format, then times opening and reading the mapped catalog."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "state.bin"
+        start = time.perf_counter()
+        with open(path, "wb") as f:
+            binary_state.write_state(f, (item.to_dict() for item in make_items(count)), {})
+        write_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        catalog = binary_state.MappedCatalog(path)
+        open_ms = 1000 * (time.perf_counter() - start)
+
+        isbns = [f"{random.randrange(count):013d}" for _ in range(10_000)]
+        start = time.perf_counter()
+        for isbn in isbns:
+            catalog.get_item(isbn)
+        get_item_us = 1e6 * (time.perf_counter() - start) / len(isbns)
+
+        start = time.perf_counter()
+        dvds = len(catalog.find_isbns("type", "DVD"))
+        scan_seconds = time.perf_counter() - start
+        file_mb = path.stat().st_size / 1e6
+        catalog.close()
+
+    return {
+        "items": count,
+        "file_mb": file_mb,
+        "write_seconds": write_seconds,
+        "open_ms": open_ms,
+        "get_item_us": get_item_us,
+        "type_scan_seconds": scan_seconds,
+        "dvds_found": dvds,
+    }
+
+
+def _joined_loan_report(path: Path, catalog: LibraryCatalog, loans: LoanManager):
+    """The export used before streaming: build every line in a list, then join and write."""
+    lines = ["--- Current Loan Report ---"]
+    for isbn, loan_data in loans.get_current_checkouts().items():
+        item = catalog.get_item(isbn)
+        lines.append(f"{isbn:<15}{item.title[:30]:<30}{loan_data['user']:<15}{loan_data['due_date'].isoformat():<10}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+
+def bench_report(count: int) -> Dict[str, float]:
+    """Peak memory and time of the loan report export with every item on loan."""
+    catalog = LibraryCatalog()
+    catalog.add_many(make_items(count))
+    loans = LoanManager(catalog)
+    loans.checkout_many((f"user{i % 5000}", item.isbn) for i, item in enumerate(catalog.iter_items()))
+    persistence = PersistenceManager(catalog, loans)
+    result: Dict[str, float] = {"loans": count}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exports = [("joined_list", lambda: _joined_loan_report(Path(tmp) / "joined.txt", catalog, loans))]
+        for report_format in ("text", "csv", "jsonl"):
+            exports.append((report_format, lambda report_format=report_format: persistence.export_loan_report(
+                report_format, path=Path(tmp) / f"report.{report_format}")))
+        exports.append(("text_by_due_date", lambda: persistence.export_loan_report(
+            "text", sort_by_due_date=True, path=Path(tmp) / "sorted.txt")))
+
+        for label, export in exports:
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            export()
+            result[f"{label}_seconds"] = time.perf_counter() - start
+            result[f"{label}_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+    return result
+
+
+def _write_import_csv(path: Path, count: int):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["type", "title", "isbn", "year", "author", "genre", "director", "file_size"])
+        for item in iter_items(count):
+            data = item.to_dict()
+            writer.writerow([data["type"], data["title"], data["isbn"], data["year"], data.get("author", ""),
+                             data.get("genre", ""), data.get("director", ""), data.get("file_size", "")])
+
+
+def bench_import(count: int, max_workers: int) -> Dict[str, float]:
+    """Rows per second for import_items_from_csv, serial and with a process pool."""
+    results = {"cores": os.cpu_count() or 1}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "import.csv"
+        _write_import_csv(path, count)
+        workers = 1
+        while workers <= max_workers:
+            catalog = LibraryCatalog()
+            persistence = PersistenceManager(catalog, LoanManager(catalog))
+            start = time.perf_counter()
+            imported, _ = persistence.import_items_from_csv(str(path), workers=workers)
+            elapsed = time.perf_counter() - start
+            assert imported == count
+            results[f"rows_per_sec_{workers}_workers"] = round(count / elapsed)
+            workers *= 2
+    return results
+
+
+# The suite's default catalog sizes; every SUITE_LOAN_STRIDE-th item of its catalogs is on loan.
+SUITE_SIZES = [1_000, 10_000, 100_000]
+SUITE_LOAN_STRIDE = 10
+SUITE_PATRONS = 5_000
+# Bumped when a change to the suite makes its results incomparable with older baselines.
+SUITE_VERSION = 1
+
+
+def bench_suite(sizes: List[int], samples: int, seed: int) -> Dict[str, Any]:
+    """
+    Times the main operations on synthetic catalogs of each size.
+
+    Runs with the same sizes, samples and seed build the same catalogs and
+    loan books and make the same calls, so their results can be compared
+    (see compare_to_baseline). add_item is timed for every item as the
+    catalog is built; get_item, checkout_item and return_item for at most
+    `samples` random items each; saving, loading, CSV import and the loan
+    report once per size.
+    """
+    results = {"version": SUITE_VERSION, "seed": seed, "samples": samples,
+               "python": platform.python_version(), "machine": platform.machine(),
+               "cpus": os.cpu_count() or 1, "sizes": {}}
+    for count in sizes:
+        results["sizes"][str(count)] = _suite_run(count, samples, random.Random(seed))
+    return results
+
+
+def _suite_run(count: int, samples: int, rng: random.Random) -> Dict[str, Any]:
+    metrics = Metrics()
+
+    def call(operation, func, *args):
+        start = time.perf_counter()
+        func(*args)
+        metrics.observe(operation, time.perf_counter() - start)
+
+    catalog = LibraryCatalog()
+    for item in iter_items(count):
+        call("add_item", catalog.add_item, item)
+    loans = LoanManager(catalog)
+    loans.checkout_many((f"Patron {rng.randrange(SUITE_PATRONS)}", f"{i:013d}")
+                        for i in range(0, count, SUITE_LOAN_STRIDE))
+
+    picks = rng.sample(range(count), min(samples, count))
+    for i in picks:
+        call("get_item", catalog.get_item, f"{i:013d}")
+    free = [f"{i:013d}" for i in picks if i % SUITE_LOAN_STRIDE]
+    for isbn in free:
+        call("checkout_item", loans.checkout_item, f"Patron {rng.randrange(SUITE_PATRONS)}", isbn)
+    for isbn in free:
+        call("return_item", loans.return_item, isbn, rng.randrange(7))
+
+    # The bulk operations are timed by the persistence layer's own instrumentation.
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        persistence = PersistenceManager(catalog, loans, metrics=metrics)
+        persistence.STATE_FILE = Path(tmp) / "state.json"
+        persistence.save_state()
+        persistence.export_loan_report("text", path=Path(tmp) / "report.txt")
+        del catalog, loans, persistence
+
+        catalog = LibraryCatalog()
+        loader = PersistenceManager(catalog, LoanManager(catalog), metrics=metrics)
+        loader.STATE_FILE = Path(tmp) / "state.json"
+        loader.load_state()
+        assert catalog.get_item_count() == count
+        del catalog, loader
+
+        path = Path(tmp) / "import.csv"
+        _write_import_csv(path, count)
+        catalog = LibraryCatalog()
+        imported, _ = PersistenceManager(catalog, LoanManager(catalog), metrics=metrics).import_items_from_csv(str(path))
+        assert imported == count
+        del catalog
+
+    snapshot = metrics.snapshot()
+    operations = {}
+    for operation, summary in snapshot["operations"].items():
+        entry = {key: summary[key] for key in ("count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")}
+        seconds = summary["mean_ms"] / 1000
+        entry["ops_per_second"] = 1 / seconds if seconds else 0.0
+        if summary["count"] == 1:
+            entry["items_per_second"] = count / seconds if seconds else 0.0
+        operations[operation] = entry
+    return {"operations": operations, "counters": snapshot["counters"]}
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Lists the operations whose mean latency grew by more than `threshold`
+    (0.2 for 20%) over `baseline`, at the sizes both runs have.
+    """
+    for setting in ("version", "seed", "samples"):
+        if baseline.get(setting) != results[setting]:
+            raise ValueError(f"The baseline was made with {setting} {baseline.get(setting)}, "
+                             f"this run with {results[setting]}; the results are not comparable.")
+    regressions = []
+    for size, run in results["sizes"].items():
+        old_operations = baseline["sizes"].get(size, {}).get("operations", {})
+        for operation, summary in run["operations"].items():
+            old = old_operations.get(operation)
+            if old and old["mean_ms"] > 0 and summary["mean_ms"] > old["mean_ms"] * (1 + threshold):
+                regressions.append(f"{operation} at {int(size):,} items: {old['mean_ms']:.4f} ms -> "
+                                   f"{summary['mean_ms']:.4f} ms (+{100 * (summary['mean_ms'] / old['mean_ms'] - 1):.0f}%)")
+    return regressions
+
+
+def _print_suite(results: Dict[str, Any]):
+    for size, run in results["sizes"].items():
+        print(f"--- Suite: {int(size):,} items ---")
+        # Operations timed once show items per second rather than calls per second.
+        print(f"{'operation':<24}{'calls':>8}{'mean ms':>11}{'p50 ms':>11}{'p99 ms':>11}{'per second':>13}")
+        for operation, summary in run["operations"].items():
+            print(f"{operation:<24}{summary['count']:>8,}{summary['mean_ms']:>11.4f}{summary['p50_ms']:>11.4f}"
+                  f"{summary['p99_ms']:>11.4f}{summary.get('items_per_second', summary['ops_per_second']):>13,.0f}")
+        for counter, value in run["counters"].items():
+            print(f"{counter:<24}{value:>8,}")
+
+
+def _run_suite(args) -> int:
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = bench_suite(sizes, args.samples, args.seed)
+    _print_suite(results)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {args.output}")
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    try:
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 2
+    if not regressions:
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}.")
+        return 0
+    print(f"Regressions beyond {args.threshold:.0%} against {args.baseline}:")
+    for regression in regressions:
+        print(f"- {regression}")
+    return 1
+
+
+def bench_replay(args) -> Dict[str, Any]:
+    """Replays simulated days of Zipf-skewed circulation and prints latency as the loan book grows."""
+    catalog = LibraryCatalog()
+    catalog.add_many(iter_items(args.items))
+    clock = workload.SimulatedClock(date(2025, 1, 1))
+    loans = LoanManager(catalog, clock=clock)
+    events = workload.iter_workload([f"{i:013d}" for i in range(args.items)], args.days, args.checkouts_per_day,
+                                    args.patrons, args.skew, args.return_days, args.seed)
+    result = workload.replay(loans, clock, events, window_days=args.window_days)
+
+    print(f"--- Replay: {args.items:,} items, {args.days} days, skew {args.skew} ---")
+    print(f"{'day':>6}{'active loans':>14}{'checkouts':>11}{'p50 ms':>9}{'p99 ms':>9}{'returns':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for window in result["windows"]:
+        print(f"{window['day']:>6}{window['active_loans']:>14,}{window['checkouts']:>11,}"
+              f"{window['checkout_p50_ms']:>9.4f}{window['checkout_p99_ms']:>9.4f}{window['returns']:>9,}"
+              f"{window['return_p50_ms']:>9.4f}{window['return_p99_ms']:>9.4f}")
+    for key, value in result["totals"].items():
+        print(f"{key:<28}{value:,.2f}" if isinstance(value, float) else f"{key:<28}{value:,}")
+    return result
+
+
+def _timed(label: str, func: Callable[[], Dict]) -> Dict:
+    start = time.perf_counter()
+    result = func()
+    result["seconds"] = time.perf_counter() - start
+    print(f"--- {label} ---")
+    for key, value in result.items():
+        print(f"{key:<28}{value:,.2f}" if isinstance(value, float) else f"{key:<28}{value:,}")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Library system benchmarks")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    memory = sub.add_parser("memory", help="bytes per catalog item, __dict__ vs __slots__")
+    memory.add_argument("--items", type=int, default=1_000_000)
+
+    loans = sub.add_parser("loans", help="single-item vs batch checkout and return")
+    loans.add_argument("--items", type=int, default=100_000)
+
+    threads = sub.add_parser("threads", help="thread-safe checkout/return throughput by thread count")
+    threads.add_argument("--items", type=int, default=100_000)
+    threads.add_argument("--max-threads", type=int, default=8)
+
+    save = sub.add_parser("save", help="cost of saving one checkout, full rewrite vs delta vs journal")
+    save.add_argument("--items", type=int, default=100_000)
+    save.add_argument("--changes", type=int, default=5)
+
+    compact = sub.add_parser("compact", help="checkpoint pause, write and swap times under load")
+    compact.add_argument("--items", type=int, default=1_000_000)
+
+    load = sub.add_parser("load", help="load_state peak memory and time-to-first-item")
+    load.add_argument("--items", type=int, default=200_000)
+
+    lazy = sub.add_parser("lazy", help="load_state time and memory, built items vs LazyCatalog")
+    lazy.add_argument("--items", type=int, default=200_000)
+
+    list_ = sub.add_parser("list", help="first page of the item listing, full copy vs cursor")
+    list_.add_argument("--items", type=int, default=200_000)
+
+    startup = sub.add_parser("startup", help="CLI time-to-menu, synchronous vs background load")
+    startup.add_argument("--items", type=int, default=200_000)
+
+    batch = sub.add_parser("batch", help="CLI batch mode transactions per second")
+    batch.add_argument("--items", type=int, default=200_000)
+
+    binary = sub.add_parser("binary", help="binary state size, open time and mapped lookups")
+    binary.add_argument("--items", type=int, default=5_000_000)
+
+    report = sub.add_parser("report", help="loan report export memory and time by format")
+    report.add_argument("--items", type=int, default=200_000)
+
+    import_ = sub.add_parser("import", help="CSV import rows/sec, serial vs process pool")
+    import_.add_argument("--items", type=int, default=200_000)
+    import_.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+
+    replay = sub.add_parser("replay", help="Zipf-skewed circulation on a simulated clock, latency as loans grow")
+    replay.add_argument("--items", type=int, default=100_000)
+    replay.add_argument("--days", type=int, default=365)
+    replay.add_argument("--checkouts-per-day", type=int, default=2_000)
+    replay.add_argument("--patrons", type=int, default=20_000)
+    replay.add_argument("--skew", type=float, default=1.0, help="Zipf exponent; 0 is uniform demand")
+    replay.add_argument("--return-days", type=float, default=21.0, help="mean days a loan is kept")
+    replay.add_argument("--window-days", type=int, default=30)
+    replay.add_argument("--seed", type=int, default=326)
+
+    suite = sub.add_parser("suite", help="time the main operations by catalog size, compared with a baseline")
+    suite.add_argument("--sizes", default=",".join(str(size) for size in SUITE_SIZES),
+                       help="comma-separated catalog sizes, e.g. 1000,100000,10000000")
+    suite.add_argument("--samples", type=int, default=10_000,
+                       help="get_item, checkout_item and return_item calls timed per size")
+    suite.add_argument("--seed", type=int, default=326)
+    suite.add_argument("--output", default="data/benchmark_results.json", help="where to write the results as JSON")
+    suite.add_argument("--baseline", help="earlier results to compare with; exits with 1 on a regression")
+    suite.add_argument("--threshold", type=float, default=0.2,
+                       help="slowdown of an operation's mean latency that counts as a regression (0.2 = 20%%)")
+
+    args = parser.parse_args(argv)
+    if args.benchmark == "memory":
+        _timed("Catalog memory", lambda: bench_memory(args.items))
+    elif args.benchmark == "loans":
+        _timed("Checkout/return", lambda: bench_loans(args.items))
+    elif args.benchmark == "threads":
+        _timed("Concurrent desks", lambda: bench_threads(args.items, args.max_threads))
+    elif args.benchmark == "save":
+        _timed("Save cost", lambda: bench_save(args.items, args.changes))
+    elif args.benchmark == "compact":
+        _timed("Checkpoint", lambda: bench_compaction(args.items))
+    elif args.benchmark == "load":
+        _timed("Load state", lambda: bench_load(args.items))
+    elif args.benchmark == "lazy":
+        _timed("Lazy load", lambda: bench_lazy(args.items))
+    elif args.benchmark == "list":
+        _timed("Item listing", lambda: bench_list(args.items))
+    elif args.benchmark == "startup":
+        _timed("Startup", lambda: bench_startup(args.items))
+    elif args.benchmark == "batch":
+        _timed("Batch mode", lambda: bench_batch(args.items))
+    elif args.benchmark == "binary":
+        _timed("Binary state", lambda: bench_binary(args.items))
+    elif args.benchmark == "report":
+        _timed("Loan report", lambda: bench_report(args.items))
+    elif args.benchmark == "import":
+        _timed("CSV import", lambda: bench_import(args.items, args.max_workers))
+    elif args.benchmark == "replay":
+        bench_replay(args)
+    elif args.benchmark == "suite":
+        return _run_suite(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""A catalog that builds items from their saved records only when they are used.
+
+Most items are never looked at in a session, so LazyCatalog keeps each one
+loaded from the state file as its JSON text. A record becomes a LibraryItem
+the first time get_item or a change needs it, and records that were never
+built are written back to the state file exactly as they were read.
+"""
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+from library_model import ITEM_CLASS_MAP, LibraryCatalog, LibraryItem
+
+
+class LazyCatalog(LibraryCatalog):
+    """
+    A LibraryCatalog that holds unbuilt items as raw JSON records.
+
+    Built items live in the usual item dict and secondary indexes; raw records
+    are in neither. find_isbns and all_items need every item, so they build
+    all remaining records first; iter_items builds each one as it reaches it.
+    """
+
+    def __init__(self, thread_safe: bool = False):
+        super().__init__(thread_safe=thread_safe)
+        # ISBN -> JSON text of a saved item that has not been built yet.
+        self._raw: Dict[str, str] = {}
+
+    def add_raw_records(self, records: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Adds saved items as (isbn, json_text) pairs without building them. Does not notify.
+
+        Records whose ISBN is already catalogued are skipped; the report has
+        the same form as LibraryCatalog.add_many's.
+        """
+        report = {"added": 0, "replaced": 0, "rejected": []}
+        with self._write_lock:
+            for isbn, text in records:
+                if isbn in self._raw or isbn in self._items:
+                    report["rejected"].append({"isbn": isbn, "reason": "duplicate ISBN"})
+                    continue
+                self._raw[isbn] = text
+                report["added"] += 1
+        return report
+
+    @property
+    def unbuilt_count(self) -> int:
+        """How many items are still held as raw records."""
+        return len(self._raw)
+
+    def _build(self, isbn: str) -> LibraryItem | None:
+        with self._write_lock:
+            text = self._raw.get(isbn)
+            if text is None:
+                return self._items.get(isbn)
+            try:
+                data = json.loads(text)
+                item = ITEM_CLASS_MAP[data["type"]].from_dict(data)
+            except Exception as e:
+                raise ValueError(f"Saved record for ISBN {isbn} is corrupted: {e}") from None
+            del self._raw[isbn]
+            self._items[isbn] = item
+            self._index(item)
+            return item
+
+    def _build_all(self):
+        with self._write_lock:
+            for isbn in list(self._raw):
+                self._build(isbn)
+
+    def snapshot(self) -> List[LibraryItem | str]:
+        """Like LibraryCatalog.snapshot, with unbuilt items given as their original JSON text."""
+        with self._write_lock:
+            return list(self._raw.values()) + list(self._items.values())
+
+    def add_item(self, item: LibraryItem):
+        with self._write_lock:
+            if item.isbn in self._raw:
+                raise ValueError(f"Item with ISBN {item.isbn} already exists.")
+            super().add_item(item)
+
+    def add_many(self, items: Iterable[LibraryItem], on_conflict: str = "error") -> Dict[str, Any]:
+        def built_conflicts():
+            # A raw record with the same ISBN is built first, so the usual conflict rules apply to it.
+            # This runs while LibraryCatalog.add_many holds its locks, which it takes in the usual order.
+            for item in items:
+                if item.isbn in self._raw:
+                    self._build(item.isbn)
+                yield item
+
+        return super().add_many(built_conflicts(), on_conflict)
+
+    def remove_item(self, isbn: str) -> LibraryItem | None:
+        self._build(isbn)
+        return super().remove_item(isbn)
+
+    def update_item(self, isbn: str, **changes) -> LibraryItem:
+        self._build(isbn)
+        return super().update_item(isbn, **changes)
+
+    def clear(self):
+        with self._write_lock:
+            self._raw.clear()
+            super().clear()
+
+    def get_item(self, isbn) -> LibraryItem | None:
+        item = self._items.get(isbn)
+        if item is None and isbn in self._raw:
+            item = self._build(isbn)
+        return item
+
+    @property
+    def all_items(self) -> List[LibraryItem]:
+        self._build_all()
+        return super().all_items
+
+    def iter_items(self) -> Iterator[LibraryItem]:
+        # The ISBNs are copied first, since building a record moves it between the two dicts.
+        with self._write_lock:
+            isbns = list(self._items) + list(self._raw)
+        for isbn in isbns:
+            item = self.get_item(isbn)
+            if item is not None:
+                yield item
+
+    def get_item_count(self) -> int:
+        return len(self._items) + len(self._raw)
+
+    def find_isbns(self, field: str, value) -> Set[str]:
+        self._build_all()
+        return super().find_isbns(field, value)
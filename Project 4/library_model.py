@@ -1,10 +1,20 @@
 import abc
+import bisect
+import threading
+from itertools import islice
+from contextlib import ExitStack, contextmanager, nullcontext
 from datetime import date, timedelta, datetime # datetime is now imported for strptime
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Set, Iterator, Iterable, Tuple, Callable, Optional
+
+from metrics import Metrics, timed
 
 class LibraryItem(ABC):
-    
+
+    # Items are stored by the million, so every class in the hierarchy uses
+    # __slots__ instead of a per-instance __dict__.
+    __slots__ = ("title", "isbn", "year", "available")
+
     def __init__(self, title: str, isbn: str, year: int, available: bool = True):
         if not all([title, isbn, year]):
             raise ValueError("Title, ISBN, and Year must be provided.")
@@ -21,13 +31,13 @@ class LibraryItem(ABC):
     def calculate_loan_period(self) -> int:
         pass
 
-    def check_out(self):
+    def check_out(self, today: date | None = None):
         if not self.available:
             return None, "Item is already checked out."
 
         loan_days = self.calculate_loan_period()
         self.available = False
-        due_date = date.today() + timedelta(days=loan_days)
+        due_date = (today or date.today()) + timedelta(days=loan_days)
         return due_date, f"'{self.title}' checked out. Due date: {due_date.isoformat()} ({loan_days} days)."
 
     def to_dict(self) -> Dict[str, Any]:
@@ -45,7 +55,9 @@ class LibraryItem(ABC):
 
 
 class Book(LibraryItem):
-    
+
+    __slots__ = ("author", "genre")
+
     def __init__(self, title, isbn, year, author, genre, available=True):
         super().__init__(title, isbn, year, available)
         self.author = author
@@ -65,7 +77,9 @@ class Book(LibraryItem):
                    data['genre'], data['available'])
 
 class DVD(LibraryItem):
-    
+
+    __slots__ = ("director",)
+
     def __init__(self, title, isbn, year, director, available=True):
         super().__init__(title, isbn, year, available)
         self.director = director
@@ -84,7 +98,9 @@ class DVD(LibraryItem):
                    data['available'])
 
 class EBook(LibraryItem):
-    
+
+    __slots__ = ("author", "file_size")
+
     def __init__(self, title, isbn, year, author, file_size, available=True):
         super().__init__(title, isbn, year, available)
         self.author = author
@@ -110,84 +126,555 @@ ITEM_CLASS_MAP = {
     "EBook": EBook,
 }
 
-class LibraryCatalog:
-    
+class StripedLock:
+    """A fixed pool of locks shared out by key hash, so unrelated keys rarely contend."""
+
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def for_key(self, key) -> threading.Lock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def all(self):
+        """Holds every stripe, in a fixed order, for the duration of the block."""
+        with ExitStack() as stack:
+            for lock in self._locks:
+                stack.enter_context(lock)
+            yield
+
+
+# Change listeners are called as listener(event, isbn); isbn is None for whole-state events.
+# They run while the change's locks are still held, so changes to one ISBN reach them in
+# order; they must be quick and must not change the catalog or loans themselves.
+ChangeListener = Callable[[str, Optional[str]], None]
+
+
+class ChangeNotifier:
+    """Mixin that lets other components (such as autosave) subscribe to state changes."""
+
+    def add_listener(self, listener: ChangeListener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: ChangeListener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event: str, isbn: str | None = None):
+        for listener in list(self._listeners):
+            listener(event, isbn)
+
+
+class ChangeSet:
+    """
+    A change listener that collects what changed since it was last drained.
+
+    `items` holds the ISBNs whose saved record changed (including availability,
+    which checkouts and returns flip) and `loans` those whose loan changed.
+    Whole-state events (clear, load) cannot be described that way and set
+    `reset` instead.
+    """
+
     def __init__(self):
+        self._lock = threading.Lock()
+        self.items: Set[str] = set()
+        self.loans: Set[str] = set()
+        self.reset = False
+
+    def __call__(self, event: str, isbn: str | None):
+        with self._lock:
+            if isbn is None:
+                self.reset = True
+                return
+            self.items.add(isbn)
+            if event in ("checkout", "return"):
+                self.loans.add(isbn)
+
+    def drain(self) -> Tuple[Set[str], Set[str], bool]:
+        """Returns (items, loans, reset) and starts collecting afresh."""
+        with self._lock:
+            changes = (self.items, self.loans, self.reset)
+            self.items, self.loans, self.reset = set(), set(), False
+        return changes
+
+
+class CatalogCursor:
+    """
+    Hands out the items of a catalog listing one page at a time.
+
+    Items are produced only as pages ask for them. Like any dict iterator,
+    a cursor over an in-memory catalog raises RuntimeError if items are
+    added or removed while it is open; changes to an item are fine.
+    """
+
+    def __init__(self, items: Iterator["LibraryItem"]):
+        self._items = items
+        self.position = 0  # items handed out so far
+        self.exhausted = False
+
+    def next_page(self, size: int = 20) -> List["LibraryItem"]:
+        page = list(islice(self._items, size))
+        self.position += len(page)
+        if len(page) < size:
+            self.exhausted = True
+        return page
+
+
+class LibraryCatalog(ChangeNotifier):
+
+    # Fields with a secondary index (value -> set of ISBNs). "type" is the class name.
+    INDEXED_FIELDS = ("type", "author", "genre", "director", "year")
+    # What add_many does with an item whose ISBN is already catalogued.
+    CONFLICT_POLICIES = ("skip", "replace", "error")
+    # Read-only catalogs refuse every change; a LoanManager over one can only look loans up.
+    read_only = False
+
+    def __init__(self, thread_safe: bool = False):
         self._items: Dict[str, LibraryItem] = {}
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in self.INDEXED_FIELDS}
+        # In thread-safe mode, item_lock(isbn) guards changes to one item (such as its
+        # availability) and _write_lock guards the shared dicts. Always take them in that order.
+        self._item_locks = StripedLock() if thread_safe else None
+        self._write_lock = threading.RLock() if thread_safe else nullcontext()
+        self._listeners: List[ChangeListener] = []
+
+    @property
+    def thread_safe(self) -> bool:
+        return self._item_locks is not None
+
+    def item_lock(self, isbn: str):
+        """Returns the lock that serializes changes to the item with this ISBN."""
+        return self._item_locks.for_key(isbn) if self._item_locks else nullcontext()
+
+    @contextmanager
+    def frozen(self):
+        """Blocks every change to the catalog for the duration of the block."""
+        with self._item_locks.all() if self._item_locks else nullcontext(), self._write_lock:
+            yield
 
     def add_item(self, item: LibraryItem):
-        if item.isbn in self._items:
-            raise ValueError(f"Item with ISBN {item.isbn} already exists.")
-        self._items[item.isbn] = item
+        with self._write_lock:
+            if item.isbn in self._items:
+                raise ValueError(f"Item with ISBN {item.isbn} already exists.")
+            self._items[item.isbn] = item
+            self._index(item)
+            self._notify("add", item.isbn)
+
+    def add_many(self, items: Iterable[LibraryItem], on_conflict: str = "error") -> Dict[str, Any]:
+        """
+        Adds items in bulk under one acquisition of the write lock.
+
+        An item conflicts when its ISBN is already catalogued, including by an
+        earlier item in the same call. "skip" keeps the existing item and reports
+        the new one as rejected, "replace" swaps the new one in, and "error"
+        raises ValueError before anything is added. Items are consumed lazily
+        unless the policy is "error".
+
+        A replacement keeps the availability of the item it replaces, so an
+        item on loan stays on loan. Because it takes over items that may be
+        checked out, "replace" also holds every item lock, blocking checkouts
+        and returns until the call finishes.
+
+        Returns {"added": n, "replaced": n, "rejected": [{"isbn": ..., "reason": ...}]}.
+        """
+        if on_conflict not in self.CONFLICT_POLICIES:
+            raise ValueError(f"Unknown conflict policy '{on_conflict}'.")
+        report = {"added": 0, "replaced": 0, "rejected": []}
+        with self.frozen() if on_conflict == "replace" else self._write_lock:
+            if on_conflict == "error":
+                items = list(items)
+                seen = set()
+                for item in items:
+                    if item.isbn in self._items or item.isbn in seen:
+                        raise ValueError(f"Item with ISBN {item.isbn} already exists.")
+                    seen.add(item.isbn)
+
+            for item in items:
+                existing = self._items.get(item.isbn)
+                if existing is None:
+                    self._items[item.isbn] = item
+                    self._index(item)
+                    report["added"] += 1
+                    self._notify("add", item.isbn)
+                elif on_conflict == "skip":
+                    report["rejected"].append({"isbn": item.isbn, "reason": "duplicate ISBN"})
+                else:
+                    self._unindex(existing)
+                    item.available = existing.available
+                    self._items[item.isbn] = item
+                    self._index(item)
+                    report["replaced"] += 1
+                    self._notify("update", item.isbn)
+        return report
+
+    def remove_item(self, isbn: str) -> LibraryItem | None:
+        with self.item_lock(isbn), self._write_lock:
+            item = self._items.pop(isbn, None)
+            if item:
+                self._unindex(item)
+                self._notify("remove", isbn)
+        return item
+
+    def update_item(self, isbn: str, **changes) -> LibraryItem:
+        """Changes fields of a catalogued item and keeps the secondary indexes in sync."""
+        item = self._items.get(isbn)
+        if not item:
+            raise KeyError(f"Item with ISBN {isbn} not found.")
+        if "isbn" in changes:
+            raise ValueError("The ISBN of a catalogued item cannot be changed.")
+        for field in changes:
+            if not hasattr(item, field):
+                raise AttributeError(f"{item.__class__.__name__} has no field '{field}'.")
+
+        with self.item_lock(isbn), self._write_lock:
+            self._unindex(item)
+            for field, value in changes.items():
+                setattr(item, field, value)
+            self._index(item)
+            self._notify("update", isbn)
+        return item
+
+    def clear(self):
+        with self._write_lock:
+            self._items.clear()
+            for index in self._indexes.values():
+                index.clear()
+            self._notify("clear")
 
     def get_item(self, isbn) -> LibraryItem | None:
         return self._items.get(isbn)
 
+    def get_item_for_loan(self, isbn) -> LibraryItem | None:
+        """
+        Returns the item a checkout or return should change; callers hold item_lock(isbn).
+
+        Here that is simply get_item. A catalog that can hand out more than one
+        object for an ISBN refreshes its availability from its own record.
+        """
+        return self.get_item(isbn)
+
+    def save_availability(self, item: LibraryItem):
+        """Records a change to item.available made under item_lock(item.isbn)."""
+
     @property
     def all_items(self) -> List[LibraryItem]:
         return list(self._items.values())
 
+    def iter_items(self) -> Iterator[LibraryItem]:
+        """Iterates over the items without copying them into a new list."""
+        return iter(self._items.values())
+
     def get_item_count(self) -> int:
         return len(self._items)
 
-
-class LoanManager:
+    def cursor(self, item_type: str | None = None, available: bool | None = None,
+               offset: int = 0) -> CatalogCursor:
+        """Returns a cursor over the items of one type and/or availability, skipping the first `offset` matches."""
+        matches = (item for item in self.iter_items()
+                   if (item_type is None or item.__class__.__name__ == item_type)
+                   and (available is None or item.available == available))
+        return CatalogCursor(islice(matches, offset, None))
+
+    def snapshot(self) -> List[LibraryItem]:
+        """Returns the items to write in a save; call it while the catalog is frozen."""
+        return self.all_items
+
+    def find_isbns(self, field: str, value) -> Set[str]:
+        """Returns the ISBNs whose indexed `field` equals `value`, without scanning the catalog."""
+        if field not in self._indexes:
+            raise ValueError(f"Field '{field}' is not indexed.")
+        with self._write_lock:
+            return set(self._indexes[field].get(value, ()))
+
+    def find_items(self, field: str, value) -> List[LibraryItem]:
+        return [self._items[isbn] for isbn in self.find_isbns(field, value)]
+
+    def _indexed_values(self, item: LibraryItem):
+        for field in self.INDEXED_FIELDS:
+            value = item.__class__.__name__ if field == "type" else getattr(item, field, None)
+            if value is not None:
+                yield field, value
+
+    def _index(self, item: LibraryItem):
+        for field, value in self._indexed_values(item):
+            self._indexes[field].setdefault(value, set()).add(item.isbn)
+
+    def _unindex(self, item: LibraryItem):
+        for field, value in self._indexed_values(item):
+            isbns = self._indexes[field].get(value)
+            if isbns is not None:
+                isbns.discard(item.isbn)
+                if not isbns:
+                    del self._indexes[field][value]
+
+
+class LoanManager(ChangeNotifier):
     
-    def __init__(self, catalog: LibraryCatalog):
+    def __init__(self, catalog: LibraryCatalog, metrics: Metrics | None = None,
+                 clock: Callable[[], date] = date.today):
         self._catalog = catalog
+        # When set, checkouts and returns record their latency here.
+        self.metrics = metrics
+        # Today's date for due dates and overdue checks; a simulation can pass its own clock.
+        self.clock = clock
         self._checkouts: Dict[str, Dict] = {} 
-
+        # Calendar buckets: due date -> ISBNs due that day, plus the bucket dates in order.
+        self._due_buckets: Dict[date, Set[str]] = {}
+        self._due_dates: List[date] = []
+        # User name -> ISBNs that user has checked out.
+        self._user_loans: Dict[str, Set[str]] = {}
+        # Follows the catalog: the catalog's item locks make each checkout or return of an
+        # ISBN atomic, and this lock guards the loan dicts shared by every ISBN.
+        self._loan_lock = threading.RLock() if catalog.thread_safe else nullcontext()
+        self._listeners: List[ChangeListener] = []
+
+    # Each operation looks the item up only once it holds the item's lock: add_many(on_conflict="replace")
+    # may swap in a new object for the ISBN, and a change made to the old one would be lost. Every change
+    # to an item's availability is handed back to the catalog with save_availability.
+
+    @timed("checkout_item")
     def checkout_item(self, user_name: str, isbn: str):
-        item = self._catalog.get_item(isbn)
-        if not item:
-            return "Error: Item not found."
-
-        # Polymorphic call
-        due_date, message = item.check_out()
-
-        if due_date:
-            self._checkouts[isbn] = {"user": user_name, "due_date": due_date}
-            return f"{message} User: {user_name}"
+        if self._catalog.read_only:
+            return "Error: The catalog is read-only."
+        with self._catalog.item_lock(isbn):
+            item = self._catalog.get_item_for_loan(isbn)
+            if not item:
+                return "Error: Item not found."
+
+            # Polymorphic call
+            due_date, message = item.check_out(self.clock())
+
+            if due_date:
+                self._catalog.save_availability(item)
+                self._add_loan(isbn, {"user": user_name, "due_date": due_date})
+                self._notify("checkout", isbn)
+                return f"{message} User: {user_name}"
         return message
 
+    @timed("return_item")
     def return_item(self, isbn: str, days_late: int = 0, fee_per_day: float = 0.50):
-        item = self._catalog.get_item(isbn)
-        if not item:
-            return "Error: Item not found."
-        
-        if isbn not in self._checkouts:
-             if not item.available:
-                 item.available = True
-                 return f"'{item.title}' returned. Was not tracked in LoanManager, corrected item status."
-             return "Item was not checked out."
-
-        item.available = True
-        user_name = self._checkouts.pop(isbn, {}).get("user", "Unknown")
+        if self._catalog.read_only:
+            return "Error: The catalog is read-only."
+        with self._catalog.item_lock(isbn):
+            item = self._catalog.get_item_for_loan(isbn)
+            if not item:
+                return "Error: Item not found."
+
+            if isbn not in self._checkouts:
+                 if not item.available:
+                     item.available = True
+                     self._catalog.save_availability(item)
+                     self._notify("return", isbn)
+                     return f"'{item.title}' returned. Was not tracked in LoanManager, corrected item status."
+                 return "Item was not checked out."
+
+            item.available = True
+            self._catalog.save_availability(item)
+            user_name = self._remove_loan(isbn).get("user", "Unknown")
+            self._notify("return", isbn)
 
         fee = max(days_late * fee_per_day, 0)
         return f"{user_name} returned '{item.title}'. Late fee: ${fee:.2f}"
 
+    @timed("checkout_many")
+    def checkout_many(self, requests: Iterable[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Checks out a batch of (user_name, isbn) pairs.
+
+        Returns one result dict per request, in order, with the keys "isbn",
+        "user", "status" ("checked_out", "unavailable", "not_found" or, over a
+        read-only catalog, "read_only") and "due_date" (None unless checked
+        out). Due dates are computed once per item type for the whole batch.
+        """
+        today = self.clock()
+        due_by_type: Dict[type, date] = {}
+        results = []
+        for user_name, isbn in requests:
+            due_date = None
+            if self._catalog.read_only:
+                results.append({"isbn": isbn, "user": user_name, "status": "read_only", "due_date": None})
+                continue
+            with self._catalog.item_lock(isbn):
+                item = self._catalog.get_item_for_loan(isbn)
+                if not item:
+                    status = "not_found"
+                elif not item.available:
+                    status = "unavailable"
+                else:
+                    item_type = type(item)
+                    due_date = due_by_type.get(item_type)
+                    if due_date is None:
+                        due_date = due_by_type[item_type] = today + timedelta(days=item.calculate_loan_period())
+                    item.available = False
+                    self._catalog.save_availability(item)
+                    self._add_loan(isbn, {"user": user_name, "due_date": due_date})
+                    self._notify("checkout", isbn)
+                    status = "checked_out"
+            results.append({"isbn": isbn, "user": user_name, "status": status, "due_date": due_date})
+        return results
+
+    @timed("return_many")
+    def return_many(self, requests: Iterable[Tuple[str, int]], fee_per_day: float = 0.50) -> List[Dict[str, Any]]:
+        """
+        Returns a batch of (isbn, days_late) pairs.
+
+        Returns one result dict per request, in order, with the keys "isbn",
+        "user", "status" ("returned", "corrected", "not_checked_out",
+        "not_found" or "read_only") and "fee". Late fees follow return_item and
+        are only charged for tracked loans.
+        """
+        requests = list(requests)
+        fees = [max(days_late * fee_per_day, 0) for _isbn, days_late in requests]
+        results = []
+        for (isbn, _days_late), fee in zip(requests, fees):
+            user_name = None
+            if self._catalog.read_only:
+                results.append({"isbn": isbn, "user": None, "status": "read_only", "fee": 0.0})
+                continue
+            with self._catalog.item_lock(isbn):
+                item = self._catalog.get_item_for_loan(isbn)
+                if not item:
+                    status = "not_found"
+                elif isbn in self._checkouts:
+                    item.available = True
+                    user_name = self._remove_loan(isbn).get("user", "Unknown")
+                    status = "returned"
+                elif not item.available:
+                    item.available = True
+                    status = "corrected"
+                else:
+                    status = "not_checked_out"
+                if status in ("returned", "corrected"):
+                    self._catalog.save_availability(item)
+                    self._notify("return", isbn)
+            results.append({"isbn": isbn, "user": user_name, "status": status,
+                            "fee": fee if status == "returned" else 0.0})
+        return results
+
     def get_current_checkouts(self) -> Dict[str, Dict]:
         return self._checkouts
 
     def checkouts_to_dict(self) -> Dict[str, Dict]:
-        serializable_checkouts = {}
-        for isbn, loan_data in self._checkouts.items():
-            serializable_checkouts[isbn] = {
-                "user": loan_data["user"],
-                "due_date": loan_data["due_date"].isoformat()
-            }
-        return serializable_checkouts
-
-    def load_checkouts_from_dict(self, data: Dict[str, Dict]):
-        self._checkouts = {}
-        for isbn, loan_data in data.items():
-            try:
-                loan_date = datetime.strptime(loan_data["due_date"], '%Y-%m-%d').date()
-                self._checkouts[isbn] = {
+        with self._loan_lock:
+            serializable_checkouts = {}
+            for isbn, loan_data in self._checkouts.items():
+                serializable_checkouts[isbn] = {
                     "user": loan_data["user"],
-                    "due_date": loan_date
+                    "due_date": loan_data["due_date"].isoformat()
                 }
-            except Exception as e:
-                print(f"Error loading checkout for {isbn}: {e}")
-                continue
+            return serializable_checkouts
+
+    def load_checkouts_from_dict(self, data: Dict[str, Dict]):
+        with self._loan_lock:
+            self._checkouts = {}
+            self._due_buckets = {}
+            self._due_dates = []
+            self._user_loans = {}
+            for isbn, loan_data in data.items():
+                try:
+                    loan_date = datetime.strptime(loan_data["due_date"], '%Y-%m-%d').date()
+                    self._add_loan(isbn, {
+                        "user": loan_data["user"],
+                        "due_date": loan_date
+                    })
+                except Exception as e:
+                    print(f"Error loading checkout for {isbn}: {e}")
+                    continue
+            self._notify("load")
+
+    def restore_checkout(self, isbn: str, user_name: str, due_date: date):
+        """Re-creates a loan with a known due date, e.g. while replaying a journal. Does not notify."""
+        with self._catalog.item_lock(isbn):
+            item = self._catalog.get_item_for_loan(isbn)
+            if item:
+                item.available = False
+                self._catalog.save_availability(item)
+            self._add_loan(isbn, {"user": user_name, "due_date": due_date})
+
+    @contextmanager
+    def frozen(self):
+        """Blocks every catalog and loan change, e.g. while taking a consistent snapshot."""
+        with self._catalog.frozen(), self._loan_lock:
+            yield
+
+    def loans_for_user(self, user_name: str) -> Set[str]:
+        """Returns the ISBNs a user currently has checked out."""
+        with self._loan_lock:
+            return set(self._user_loans.get(user_name, ()))
+
+    def count_for_user(self, user_name: str) -> int:
+        return len(self._user_loans.get(user_name, ()))
+
+    def overdue(self, as_of: date | None = None) -> List[str]:
+        """Returns the ISBNs due before `as_of` (default today), earliest due date first."""
+        as_of = as_of or self.clock()
+        with self._loan_lock:
+            end = bisect.bisect_left(self._due_dates, as_of)
+            return self._isbns_due_on(self._due_dates[:end])
+
+    def due_between(self, start: date, end: date) -> List[str]:
+        """Returns the ISBNs due from `start` to `end` inclusive, earliest due date first."""
+        with self._loan_lock:
+            lo = bisect.bisect_left(self._due_dates, start)
+            hi = bisect.bisect_right(self._due_dates, end)
+            return self._isbns_due_on(self._due_dates[lo:hi])
+
+    def iter_loans(self, by_due_date: bool = False) -> Iterator[Tuple[str, Dict]]:
+        """
+        Yields (isbn, loan) for every current loan, earliest due date first if asked.
+
+        Only the ISBNs are copied (one due date at a time when sorting), so this
+        is cheap for large loan books. Loans that end while it runs are left out.
+        """
+        if by_due_date:
+            with self._loan_lock:
+                due_dates = list(self._due_dates)
+            for due_date in due_dates:
+                with self._loan_lock:
+                    isbns = sorted(self._due_buckets.get(due_date, ()))
+                yield from self._loans_of(isbns)
+        else:
+            with self._loan_lock:
+                isbns = list(self._checkouts)
+            yield from self._loans_of(isbns)
+
+    def _loans_of(self, isbns: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+        for isbn in isbns:
+            loan = self._checkouts.get(isbn)
+            if loan is not None:
+                yield isbn, loan
+
+    def _isbns_due_on(self, due_dates: Iterable[date]) -> List[str]:
+        return [isbn for due_date in due_dates for isbn in sorted(self._due_buckets[due_date])]
+
+    def _add_loan(self, isbn: str, loan: Dict):
+        with self._loan_lock:
+            if isbn in self._checkouts:
+                self._remove_loan(isbn)
+            self._checkouts[isbn] = loan
+            due_date = loan["due_date"]
+            bucket = self._due_buckets.get(due_date)
+            if bucket is None:
+                bucket = self._due_buckets[due_date] = set()
+                bisect.insort(self._due_dates, due_date)
+            bucket.add(isbn)
+            self._user_loans.setdefault(loan["user"], set()).add(isbn)
+
+    def _remove_loan(self, isbn: str) -> Dict:
+        with self._loan_lock:
+            loan = self._checkouts.pop(isbn, None)
+            if loan is None:
+                return {}
+            due_date = loan["due_date"]
+            bucket = self._due_buckets.get(due_date)
+            if bucket is not None:
+                bucket.discard(isbn)
+                if not bucket:
+                    del self._due_buckets[due_date]
+                    del self._due_dates[bisect.bisect_left(self._due_dates, due_date)]
+            isbns = self._user_loans.get(loan["user"])
+            if isbns is not None:
+                isbns.discard(isbn)
+                if not isbns:
+                    del self._user_loans[loan["user"]]
+            return loan
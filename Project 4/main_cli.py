@@ -1,24 +1,85 @@
-from library_model import LibraryCatalog, LoanManager, Book, DVD, EBook
-from persistence_manager import PersistenceManager
+from library_model import ITEM_CLASS_MAP, LibraryCatalog, LoanManager, Book, DVD, EBook
+from persistence_manager import PersistenceManager, DATA_DIR
+from sqlite_store import SQLiteStore, SQLiteCatalog
+from lazy_catalog import LazyCatalog
+from metrics import Metrics
 from pathlib import Path
+import argparse
 import csv
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext, redirect_stdout
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, TextIO
+
+# With instant=True, LibraryCLI() must reach the menu within this many seconds, whatever the catalog size.
+STARTUP_TARGET_SECONDS = 0.25
+# Consecutive batch checkouts or returns are handed to the loan manager this many at a time.
+BATCH_CHUNK_SIZE = 1000
+# Loan statuses (from checkout_many/return_many) that count as success in a batch.
+BATCH_OK_STATUSES = {"checked_out", "returned", "corrected"}
+# Items or loans shown per page by "List All Items".
+LIST_PAGE_SIZE = 20
 
 class LibraryCLI:
 
-    def __init__(self):
-        self.catalog = LibraryCatalog()
-        self.loan_manager = LoanManager(self.catalog)
-        self.persistence = PersistenceManager(self.catalog, self.loan_manager)
+    def __init__(self, autosave_delay: float | None = None, journal: bool = False,
+                 compact_after: int | None = None, sqlite: bool = False, lazy: bool = False,
+                 delta: bool = False, instant: bool = False, metrics_file: str | None = None,
+                 seed_demo: bool = True):
+        # Autosave, compaction and background loading work from other threads,
+        # so the catalog must be thread-safe.
+        thread_safe = autosave_delay is not None or bool(compact_after) or instant
+        if sqlite:
+            DATA_DIR.mkdir(exist_ok=True)
+        store = SQLiteStore(DATA_DIR / "library.db") if sqlite else None
+        if store:
+            self.catalog = SQLiteCatalog(store, thread_safe=thread_safe)
+        elif lazy:
+            self.catalog = LazyCatalog(thread_safe=thread_safe)
+        else:
+            self.catalog = LibraryCatalog(thread_safe=thread_safe)
+        # With a metrics file, operations are timed and the metrics are written there on exit.
+        self.metrics = Metrics() if metrics_file else None
+        self._metrics_file = metrics_file
+        self.loan_manager = LoanManager(self.catalog, metrics=self.metrics)
+        self.persistence = PersistenceManager(self.catalog, self.loan_manager, journal=journal,
+                                              compact_after=compact_after, store=store, delta_saves=delta,
+                                              metrics=self.metrics)
+        self.autosave = None
+        self._autosave_delay = autosave_delay
+        # Demo items are for trying out the menu; scripted runs start from the saved state alone.
+        self._seed_demo = seed_demo
+        self.loader = None
         
         print("\n--- System Initialization ---")
-        print(self.persistence.load_state())
-        
-        if self.catalog.get_item_count() == 0:
+        if instant:
+            # The menu comes up at once; each operation waits only for the items it needs.
+            print("Loading state in the background...")
+            self.loader = self.persistence.load_state_in_background(on_done=self._finish_startup)
+        else:
+            self._finish_startup(self.persistence.load_state())
+
+    def _finish_startup(self, load_message: str):
+        print(load_message)
+        if self._seed_demo and self.catalog.get_item_count() == 0:
             print("Catalog is empty. Adding demo items.")
             self._add_demo_items()
+
+        if self._autosave_delay is not None:
+            self.autosave = self.persistence.start_autosave(delay=self._autosave_delay)
+            print(f"Autosave on: changes are saved {self._autosave_delay:g}s after they stop.")
         
         print(f"System ready with {self.catalog.get_item_count()} items.")
 
+    def _wait_for_load(self, isbn: str | None = None):
+        """With instant start, blocks until `isbn` (or, without one, the whole state) is loaded."""
+        if self.loader and not self.loader.done:
+            print("Waiting for the state to finish loading..." if isbn is None else f"Waiting for {isbn} to load...")
+            self.loader.wait(isbn)
+
     def _add_demo_items(self):
 
         try:
@@ -40,6 +101,7 @@ class LibraryCLI:
             "5. Export Loan Report\n"
             "6. Save State & Exit\n"
             "7. Exit Without Saving\n"
+            "8. Show Metrics\n"
             "--------------------"
         )
         
@@ -47,6 +109,9 @@ class LibraryCLI:
             print(menu)
             choice = input("Enter choice: ").strip()
             
+            if choice in ('1', '4', '5', '6'):
+                self._wait_for_load()
+
             if choice == '1':
                 self.list_items()
             elif choice == '2':
@@ -58,30 +123,180 @@ class LibraryCLI:
             elif choice == '5':
                 self.handle_export()
             elif choice == '6':
+                if self.autosave:
+                    self.autosave.close(flush=False)
                 print(self.persistence.save_state())
+                self.persistence.close()
+                self._write_metrics()
                 break
             elif choice == '7':
+                if self.autosave:
+                    # Changes already autosaved stay saved; pending ones are dropped.
+                    self.autosave.close(flush=False)
+                # In journal mode every change is already in the journal.
+                self.persistence.close()
+                self._write_metrics()
                 break
+            elif choice == '8':
+                self.show_metrics()
             else:
                 print("Invalid choice. Please try again.")
 
+    def run_batch(self, commands: Iterable[str], results: TextIO, report_all: bool = False) -> Dict[str, Any]:
+        """
+        Runs one command per line, without prompts, and saves once at the end.
+
+        Commands are "checkout ISBN USER", "return ISBN [DAYS_LATE]",
+        "import PATH [WORKERS]", "export [FORMAT [PATH]]" and "save"; blank
+        lines and lines starting with '#' are skipped. A JSON line is written
+        to `results` for each failed command (for every command with
+        report_all), then a summary line, which is also returned. Runs of
+        checkouts or returns go through checkout_many/return_many.
+        """
+        self._wait_for_load()
+        start = time.perf_counter()
+        summary = {"commands": 0, "ok": 0, "failed": 0}
+        pending: List[tuple] = []  # (line_number, command, args) of the current run of checkouts or returns
+        changed = False
+
+        def report(result: Dict[str, Any], ok: bool):
+            summary["commands"] += 1
+            summary["ok" if ok else "failed"] += 1
+            if report_all or not ok:
+                results.write(json.dumps(result, default=str) + "\n")
+
+        def flush_loans():
+            if not pending:
+                return
+            if pending[0][1] == "checkout":
+                outcomes = self.loan_manager.checkout_many((args[1], args[0]) for _, _, args in pending)
+            else:
+                outcomes = self.loan_manager.return_many((args[0], args[1]) for _, _, args in pending)
+            for (line_number, command, _), outcome in zip(pending, outcomes):
+                report({"line": line_number, "command": command, **outcome}, outcome["status"] in BATCH_OK_STATUSES)
+            pending.clear()
+
+        for line_number, line in enumerate(commands, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            command, _, rest = line.partition(' ')
+            try:
+                args = self._parse_batch_args(command, rest.strip())
+            except ValueError as e:
+                flush_loans()
+                report({"line": line_number, "command": command, "status": "invalid", "message": str(e)}, False)
+                continue
+
+            if command in ("checkout", "return"):
+                if pending and (pending[0][1] != command or len(pending) >= BATCH_CHUNK_SIZE):
+                    flush_loans()
+                pending.append((line_number, command, args))
+                changed = True
+                continue
+
+            flush_loans()
+            if command == "import":
+                _count, message = self.persistence.import_items_from_csv(*args)
+                changed = True
+            elif command == "export":
+                message = self.persistence.export_loan_report(*args)
+            else:
+                message = self.persistence.save_state()
+            ok = not message.startswith("ERROR")
+            if command == "save":
+                changed = not ok
+            report({"line": line_number, "command": command, "status": "ok" if ok else "error",
+                    "message": message}, ok)
+        flush_loans()
+
+        if self.autosave:
+            self.autosave.close(flush=False)
+        if changed:
+            summary["save"] = self.persistence.save_state()
+        self.persistence.close()
+        self._write_metrics()
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        results.write(json.dumps({"summary": summary}) + "\n")
+        return summary
+
+    @staticmethod
+    def _parse_batch_args(command: str, rest: str) -> tuple:
+        """Splits the arguments of one batch command; raises ValueError if they do not fit it."""
+        if command == "checkout":
+            isbn, _, user = rest.partition(' ')
+            if not isbn or not user.strip():
+                raise ValueError("usage: checkout ISBN USER")
+            return isbn, user.strip()
+        if command == "return":
+            parts = rest.split()
+            if len(parts) not in (1, 2):
+                raise ValueError("usage: return ISBN [DAYS_LATE]")
+            return parts[0], int(parts[1]) if len(parts) == 2 else 0
+        if command == "import":
+            parts = rest.split()
+            if len(parts) not in (1, 2):
+                raise ValueError("usage: import PATH [WORKERS]")
+            return parts[0], int(parts[1]) if len(parts) == 2 else 1
+        if command == "export":
+            parts = rest.split()
+            if len(parts) > 2:
+                raise ValueError("usage: export [FORMAT [PATH]]")
+            return (parts[0] if parts else "text", False, Path(parts[1]) if len(parts) == 2 else None)
+        if command == "save":
+            if rest:
+                raise ValueError("usage: save")
+            return ()
+        raise ValueError(f"unknown command '{command}'")
+
     def list_items(self):
-        if not self.catalog.all_items:
+        if not self.catalog.get_item_count():
             print("The catalog is currently empty.")
             return
 
+        item_type = input("Type (Book/DVD/EBook, blank for all): ").strip() or None
+        if item_type is not None and item_type not in ITEM_CLASS_MAP:
+            print(f"Unknown type '{item_type}'.")
+            return
+        availability = input("Only available (a), only on loan (l) or all (blank): ").strip().lower()
+        available = {"a": True, "l": False}.get(availability)
+
         print("\n--- Catalog Items ---")
-        for item in self.catalog.all_items:
-            print(f"- {item}")
-        
+        cursor = self.catalog.cursor(item_type=item_type, available=available)
+        if not self._show_pages(lambda: [f"- {item}" for item in cursor.next_page(LIST_PAGE_SIZE)]):
+            return
+
         print("\n--- Current Loans ---")
-        loans = self.loan_manager.get_current_checkouts()
-        if not loans:
-            print("No items currently on loan.")
+        loans = self.loan_manager.iter_loans()
+        self._show_pages(lambda: [f"ISBN: {isbn} | User: {data['user']} | Due: {data['due_date'].isoformat()}"
+                                  for isbn, data in islice(loans, LIST_PAGE_SIZE)],
+                         empty="No items currently on loan.")
+
+    def _show_pages(self, next_page: Callable[[], List[str]], empty: str = "No matching items.") -> bool:
+        """Prints pages of lines until they run out; returns False if the user stopped early."""
+        page = next_page()
+        if not page:
+            print(empty)
+        while page:
+            print("\n".join(page))
+            if len(page) < LIST_PAGE_SIZE:
+                break
+            page = next_page()
+            if page and input("-- Enter for more, q to stop: ").strip().lower() == "q":
+                return False
+        return True
+
+    def show_metrics(self):
+        if self.metrics is None:
+            print("Metrics are off. Start the CLI with --metrics FILE to collect them.")
             return
-        for isbn, data in loans.items():
-             print(f"ISBN: {isbn} | User: {data['user']} | Due: {data['due_date'].isoformat()}")
+        print("\n--- Metrics ---")
+        print(self.metrics.format_report())
+        self._write_metrics()
 
+    def _write_metrics(self):
+        if self.metrics is not None:
+            print(self.metrics.write_json(Path(self._metrics_file)))
 
     def handle_checkout(self):
         isbn = input("Enter ISBN to checkout: ").strip()
@@ -90,6 +305,7 @@ class LibraryCLI:
             print("User name cannot be empty.")
             return
         
+        self._wait_for_load(isbn)
         result = self.loan_manager.checkout_item(user, isbn)
         print(f"\n{result}")
 
@@ -101,6 +317,7 @@ class LibraryCLI:
             print("Invalid input for days late. Assuming 0.")
             days_late = 0
 
+        self._wait_for_load(isbn)
         result = self.loan_manager.return_item(isbn, days_late=days_late)
         print(f"\n{result}")
 
@@ -114,13 +331,17 @@ class LibraryCLI:
         
         count, message = self.persistence.import_items_from_csv(str(import_path))
         print(message)
+        for warning in self.persistence.import_errors:
+            print(warning)
         if count > 0:
             print(f"Import successful. Total items now: {self.catalog.get_item_count()}")
 
     def handle_export(self):
 
         print("\n--- Exporting Loan Report ---")
-        result = self.persistence.export_loan_report()
+        report_format = input("Format (text/csv/jsonl) [text]: ").strip().lower() or "text"
+        sort_by_due_date = input("Sort by due date? (y/N): ").strip().lower() == 'y'
+        result = self.persistence.export_loan_report(report_format, sort_by_due_date=sort_by_due_date)
         print(result)
 
     def _create_dummy_csv(self, file_path: Path):
@@ -137,5 +358,53 @@ class LibraryCLI:
 
 
 if __name__ == "__main__":
-    cli = LibraryCLI()
-    cli.run()
+    parser = argparse.ArgumentParser(description="Library management CLI")
+    parser.add_argument("--autosave", type=float, metavar="SECONDS",
+                        help="save in the background this many seconds after changes stop")
+    parser.add_argument("--journal", action="store_true",
+                        help="append each change to a journal instead of rewriting the state file")
+    parser.add_argument("--compact-after", type=int, metavar="RECORDS",
+                        help="with --journal, fold the journal into a new snapshot every RECORDS changes")
+    parser.add_argument("--sqlite", action="store_true",
+                        help="keep items and loans in data/library.db, written through on every change")
+    parser.add_argument("--lazy", action="store_true",
+                        help="build items from the state file only when they are first used")
+    parser.add_argument("--instant", action="store_true",
+                        help="show the menu at once and load the state in the background")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="run the commands in FILE ('-' for stdin) instead of the menu, then save")
+    parser.add_argument("--results", metavar="FILE",
+                        help="with --batch, write the JSON result lines to FILE instead of stdout")
+    parser.add_argument("--all-results", action="store_true",
+                        help="with --batch, write a result line for every command, not only failures")
+    parser.add_argument("--verbose", action="store_true",
+                        help="with --batch, show the usual startup and save messages on stderr")
+    parser.add_argument("--delta", action="store_true",
+                        help="save only the items and loans changed since the last full snapshot")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="time operations and write the metrics to FILE as JSON on exit and from the menu")
+    args = parser.parse_args()
+    if args.compact_after and not args.journal:
+        parser.error("--compact-after requires --journal")
+    if args.delta and (args.journal or args.sqlite):
+        parser.error("--delta cannot be combined with --journal or --sqlite")
+
+    options = dict(autosave_delay=args.autosave, journal=args.journal, compact_after=args.compact_after,
+                   sqlite=args.sqlite, lazy=args.lazy, delta=args.delta, instant=args.instant,
+                   metrics_file=args.metrics)
+    if not args.batch:
+        LibraryCLI(**options).run()
+    else:
+        results = open(args.results, 'w', encoding='utf-8') if args.results else sys.stdout
+        commands = sys.stdin if args.batch == '-' else open(args.batch, 'r', encoding='utf-8')
+        try:
+            # The library's own messages would be mixed into the results, so they are dropped or sent to stderr.
+            with nullcontext(sys.stderr) if args.verbose else open(os.devnull, 'w') as messages, \
+                    redirect_stdout(messages):
+                summary = LibraryCLI(**options, seed_demo=False).run_batch(commands, results, report_all=args.all_results)
+        finally:
+            if commands is not sys.stdin:
+                commands.close()
+            if results is not sys.stdout:
+                results.close()
+        sys.exit(1 if summary["failed"] else 0)
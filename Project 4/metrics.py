@@ -0,0 +1,154 @@
+"""Per-operation latency and throughput metrics for the library system.
+
+A Metrics object is passed to LoanManager and PersistenceManager
+(metrics=...). Each instrumented call adds its duration to a histogram for
+its operation, and persistence adds byte and row counters. Without a
+Metrics object the instrumented methods only pay for one extra call.
+
+Latencies are kept in fixed log-spaced buckets rather than as samples, so
+recording is O(log buckets) and memory stays constant however many calls
+there are. Percentiles are reported as the upper bound of their bucket,
+which is within BUCKET_GROWTH of the true value.
+"""
+import bisect
+import functools
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+# Bucket upper bounds in seconds, from 100 nanoseconds up to about 100 seconds.
+BUCKET_GROWTH = 1.25
+BUCKET_BOUNDS: List[float] = [1e-7 * BUCKET_GROWTH ** k for k in range(94)]
+PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+
+class LatencyHistogram:
+    """Call count, total, maximum and bucketed distribution of one operation's latencies."""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        # One extra bucket for anything slower than the last bound.
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """The latency in seconds that `fraction` of the calls did not exceed."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return min(BUCKET_BOUNDS[index], self.max) if index < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def to_dict(self, uptime: float) -> Dict[str, float]:
+        summary = {"count": self.count,
+                   "per_second": self.count / uptime if uptime > 0 else 0.0,
+                   "mean_ms": 1000 * self.total / self.count if self.count else 0.0}
+        for name, fraction in PERCENTILES.items():
+            summary[f"{name}_ms"] = 1000 * self.percentile(fraction)
+        summary["max_ms"] = 1000 * self.max
+        return summary
+
+
+class Metrics:
+    """Thread-safe latency histograms per operation plus named counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, LatencyHistogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._started = time.monotonic()
+
+    def observe(self, operation: str, seconds: float):
+        """Records one call of `operation` that took `seconds`."""
+        with self._lock:
+            histogram = self._latencies.get(operation)
+            if histogram is None:
+                histogram = self._latencies[operation] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    @contextmanager
+    def timed(self, operation: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(operation, time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self._counters.clear()
+            self._started = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The current counters and per-operation latency summaries, as plain JSON-ready data."""
+        with self._lock:
+            uptime = time.monotonic() - self._started
+            return {
+                "uptime_seconds": uptime,
+                "operations": {operation: histogram.to_dict(uptime)
+                               for operation, histogram in sorted(self._latencies.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def write_json(self, path: Path) -> str:
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=4)
+            return f"Metrics written to {path}"
+        except IOError as e:
+            return f"ERROR: Failed to write metrics due to file operation error: {e}"
+
+    def format_report(self) -> str:
+        """The snapshot as a plain-text table."""
+        snapshot = self.snapshot()
+        lines = [f"Uptime: {snapshot['uptime_seconds']:.1f} s",
+                 f"{'Operation':<22}{'Count':>9}{'Per s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Max ms':>10}"]
+        for operation, summary in snapshot["operations"].items():
+            lines.append(f"{operation:<22}{summary['count']:>9}{summary['per_second']:>10.1f}"
+                         f"{summary['p50_ms']:>10.3f}{summary['p95_ms']:>10.3f}{summary['p99_ms']:>10.3f}"
+                         f"{summary['max_ms']:>10.3f}")
+        if not snapshot["operations"]:
+            lines.append("No operations recorded yet.")
+        for counter, value in snapshot["counters"].items():
+            lines.append(f"{counter}: {value:,}")
+        return "\n".join(lines)
+
+
+def timed(operation: str) -> Callable:
+    """Decorates a method to record its latency in `self.metrics`, when that is set."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            metrics = self.metrics
+            if metrics is None:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                metrics.observe(operation, time.perf_counter() - start)
+        return wrapper
+    return decorate
@@ -1,38 +1,682 @@
-from library_model import LibraryCatalog, LoanManager, ITEM_CLASS_MAP
+from library_model import LibraryCatalog, LoanManager, ChangeSet, ITEM_CLASS_MAP
 from library_model import Book, DVD, EBook, LibraryItem
+import binary_state
+from metrics import Metrics, timed
+from sqlite_store import SQLiteStore
+from lazy_catalog import LazyCatalog
 from pathlib import Path
 import json
 import csv
-from typing import Dict, Any, Tuple, List
-from datetime import date
+import io
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Any, Tuple, List, Set, Iterator, Iterable, Callable, TextIO
+from datetime import date, datetime
 
 # Define file paths using pathlib
 DATA_DIR = Path("./data")
 STATE_FILE = DATA_DIR / "library_state.json"
+JOURNAL_FILE = DATA_DIR / "library_state.journal"
+DELTA_FILE = DATA_DIR / "library_state.delta"
+BINARY_STATE_FILE = DATA_DIR / "library_state.bin"
 REPORT_FILE = DATA_DIR / "loan_report.txt"
+# Loan report formats and the suffix each one's file gets.
+REPORT_SUFFIXES = {"text": ".txt", "csv": ".csv", "jsonl": ".jsonl"}
+REPORT_BUFFER_SIZE = 1024 * 1024
+# The fields each item type's from_dict reads: every slot in its class hierarchy.
+ITEM_FIELDS = {name: [field for klass in reversed(cls.__mro__) for field in getattr(klass, "__slots__", ())]
+               for name, cls in ITEM_CLASS_MAP.items()}
+
+
+def _fsync_dir(path: Path):
+    """Makes a rename inside `path` durable (a no-op where directories cannot be opened)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+_WHITESPACE = re.compile(r"\s*")
+_DECODER = json.JSONDecoder()
+
+
+class _StreamingJSONReader:
+    """Decodes JSON values one at a time from a text file, reading it in chunks."""
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, f):
+        self._file = f
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _read_more(self, size: int) -> bool:
+        chunk = self._file.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character ('' at the end of the file)."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more(self.CHUNK_SIZE):
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"Expecting one of {chars!r}", self._buffer, self._pos)
+        self._pos += 1
+        return char
+
+    def value(self, raw: bool = False) -> Any:
+        """Decodes the next value; with raw=True, returns (value, its JSON text)."""
+        self.peek()
+        size = self.CHUNK_SIZE
+        while True:
+            try:
+                start = self._pos
+                value, end = _DECODER.raw_decode(self._buffer, start)
+                # A value that runs to the end of the buffer (e.g. a number) may continue.
+                if end < len(self._buffer) or self._eof or not self._read_more(size):
+                    self._pos = end
+                    return (value, self._buffer[start:end]) if raw else value
+            except json.JSONDecodeError:
+                if not self._read_more(size):
+                    raise
+            size *= 2
+
+
+def iter_state_file(f, raw_items: bool = False) -> Iterator[Tuple[str, Any]]:
+    """
+    Yields (key, value) pairs from a state file without loading it whole.
+
+    Each element of "catalog_items" is yielded on its own as
+    ("catalog_items", item_dict), or ("catalog_items", (item_dict, json_text))
+    with raw_items; other top-level keys are decoded in one go.
+    Raises json.JSONDecodeError for malformed input.
+    """
+    reader = _StreamingJSONReader(f)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key == "catalog_items":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield key, reader.value(raw=raw_items)
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            yield key, reader.value()
+        if reader.expect(",}") == "}":
+            return
+
+
+def _repair_journal_tail(path: Path):
+    """
+    Makes a journal end on a line break, so the next record appended starts on its own line.
+
+    A final line cut short by a crash is cut off; one that holds a whole record
+    and only lacks its line break gets one.
+    """
+    if not path.exists():
+        return
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Find the start of the final line, reading backwards a block at a time.
+        start = size
+        while start > 0:
+            block_start = max(0, start - 65536)
+            f.seek(block_start)
+            newline = f.read(start - block_start).rfind(b"\n")
+            if newline != -1:
+                start = block_start + newline + 1
+                break
+            start = block_start
+        f.seek(start)
+        try:
+            json.loads(f.read())
+            f.write(b"\n")
+        except ValueError:
+            f.truncate(start)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _seal_journal(path: Path, sealed_path: Path):
+    """Moves the records in `path` to the end of `sealed_path`, leaving `path` absent."""
+    if not path.exists():
+        return
+    if not sealed_path.exists():
+        os.replace(path, sealed_path)
+    else:
+        # A previous checkpoint did not finish; keep its sealed records first.
+        _repair_journal_tail(sealed_path)
+        with open(path, 'r', encoding='utf-8') as src, open(sealed_path, 'a', encoding='utf-8') as dst:
+            dst.write(src.read())
+            dst.flush()
+            os.fsync(dst.fileno())
+        path.unlink()
+    _fsync_dir(path.parent)
+
+
+# Builds the item a CSV row describes, given the row and its parsed year.
+CSV_ITEM_BUILDERS = {
+    "Book": lambda row, year: Book(row['title'], row['isbn'], year, row['author'], row['genre']),
+    # Use .get() for director as it might be missing
+    "DVD": lambda row, year: DVD(row['title'], row['isbn'], year, row.get('director', 'N/A')),
+    # Safely cast file_size to float, using 0.0 if the string is empty/missing
+    "EBook": lambda row, year: EBook(row['title'], row['isbn'], year, row['author'],
+                                     float(row.get('file_size') or 0.0)),
+}
+
+
+def _items_from_csv_rows(rows: Iterable[Dict[str, str]]) -> Iterator[Tuple[LibraryItem | None, str | None]]:
+    """Yields (item, None) for each usable CSV row and (None, warning) for each skipped one."""
+    for row in rows:
+        builder = CSV_ITEM_BUILDERS.get(row.get('type'))
+        # Skip rows that cannot be mapped or identified
+        if builder is None or not row.get('isbn'):
+            yield None, f"WARNING: Skipping row with unknown type or missing ISBN: {row.get('isbn')}"
+            continue
+        try:
+            # Use a default year (e.g., 0) if the year is missing
+            item, warning = builder(row, int(row.get('year') or 0)), None
+        except ValueError as ve:
+            # Catches int('YearFail') and float('') errors, allowing the loop to continue
+            item, warning = None, f"WARNING: Skipping row {row.get('isbn')} due to incomplete/invalid data for model: {ve}"
+        except Exception as e:
+            # Catches other unexpected errors during item creation
+            item, warning = None, f"WARNING: Skipping row {row.get('isbn')} due to creation/addition error: {e}"
+        yield item, warning
+
+
+def _csv_chunks(path: Path, data_start: int, count: int) -> List[Tuple[int, int]]:
+    """Splits the bytes after the header into about `count` ranges that each start at a row."""
+    size = path.stat().st_size
+    bounds = [data_start]
+    with open(path, 'rb') as f:
+        for i in range(1, count):
+            f.seek(data_start + (size - data_start) * i // count)
+            f.readline()  # finish the row we landed in
+            position = f.tell()
+            if position >= size:
+                break
+            if position > bounds[-1]:
+                bounds.append(position)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _parse_csv_chunk(path: str, start: int, end: int,
+                     fieldnames: List[str]) -> List[Tuple[LibraryItem | None, str | None]]:
+    """Parses one byte range of a CSV file; runs in a worker process."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    reader = csv.DictReader(io.StringIO(text, newline=''), fieldnames=fieldnames)
+    return list(_items_from_csv_rows(reader))
+
+
+def _state_record(item: LibraryItem | str) -> Dict[str, Any] | str:
+    """Turns an entry of LibraryCatalog.snapshot into a state file record; JSON text passes through."""
+    return item if isinstance(item, str) else item.to_dict()
+
+
+def _loan_report_writer(f: TextIO, report_format: str) -> Callable[[str, str, str, str], None]:
+    """Writes the report header to `f` and returns a function that writes one loan row."""
+    if report_format == "csv":
+        writer = csv.writer(f)
+        writer.writerow(["isbn", "title", "user", "due_date"])
+        return lambda isbn, title, user, due_date: writer.writerow((isbn, title, user, due_date))
+
+    if report_format == "jsonl":
+        def write_json_row(isbn, title, user, due_date):
+            f.write(json.dumps({"isbn": isbn, "title": title, "user": user, "due_date": due_date}))
+            f.write("\n")
+        return write_json_row
+
+    f.write("--- Current Loan Report ---\n")
+    f.write(f"Generated: {date.today().isoformat()}\n")
+    f.write("-" * 30 + "\n")
+    f.write(f"{'ISBN':<15}{'Title':<30}{'User':<15}{'Due Date':<10}\n")
+    f.write("-" * 70 + "\n")
+
+    def write_text_row(isbn, title, user, due_date):
+        title = (title[:27] + '...') if len(title) > 30 else title
+        f.write(f"{isbn:<15}{title:<30}{user:<15}{due_date:<10}\n")
+    return write_text_row
+
+
+class AutosaveWorker:
+    """
+    Saves the library state from a background thread after it changes.
+
+    Bursts of changes are coalesced into one save, which starts once no change
+    has arrived for `delay` seconds, or `max_delay` seconds after the first
+    unsaved change if changes keep coming. The snapshot is taken with all
+    changes briefly blocked; the JSON encoding and file write happen after.
+    """
+
+    def __init__(self, persistence: "PersistenceManager", delay: float = 1.0, max_delay: float = 10.0):
+        self._persistence = persistence
+        self._delay = delay
+        self._max_delay = max_delay
+        self._cond = threading.Condition()
+        self._changes = 0  # changes seen so far
+        self._saved = 0  # changes covered by the last finished save
+        self._first_change = None  # time.monotonic() of the first unsaved change
+        self._last_change = None
+        self._flush_requested = False
+        self._closed = False
+        self.save_count = 0
+        self.last_result = None
+
+        persistence.watch(self.notify)
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def notify(self, event=None, isbn=None):
+        """Records a change; called by the catalog and loan manager."""
+        with self._cond:
+            now = time.monotonic()
+            self._changes += 1
+            self._last_change = now
+            if self._first_change is None:
+                self._first_change = now
+            self._cond.notify_all()
+
+    def flush(self) -> str | None:
+        """Saves pending changes now and waits until they are written."""
+        with self._cond:
+            target = self._changes
+            if self._saved < target:
+                self._flush_requested = True
+                self._cond.notify_all()
+            while self._saved < target and self._thread.is_alive():
+                self._cond.wait(0.1)
+            return self.last_result
+
+    def close(self, flush: bool = True) -> str | None:
+        """Stops the worker, first saving pending changes unless flush is False."""
+        self._persistence.unwatch(self.notify)
+        with self._cond:
+            if not flush:
+                self._saved = self._changes
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        return self.last_result
+
+    def _run(self):
+        with self._cond:
+            while True:
+                if self._saved >= self._changes:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                    continue
+
+                now = time.monotonic()
+                due = min(self._last_change + self._delay, self._first_change + self._max_delay)
+                if now < due and not (self._flush_requested or self._closed):
+                    self._cond.wait(due - now)
+                    continue
+
+                target = self._changes
+                self._first_change = None
+                self._flush_requested = False
+                self._cond.release()
+                metrics = self._persistence.metrics
+                try:
+                    with metrics.timed("autosave") if metrics else nullcontext():
+                        result = self._persistence._write_state()
+                finally:
+                    self._cond.acquire()
+                self._saved = max(self._saved, target)
+                self.save_count += 1
+                self.last_result = result
+                self._cond.notify_all()
+
+
+class BackgroundLoad:
+    """
+    Runs PersistenceManager.load_state on a thread, so the caller can go on at once.
+
+    wait(isbn) returns as soon as that item and the loans are loaded, which
+    lets a clerk work on one item while the rest of the catalog streams in.
+    When per_isbn is False, and for wait() without an ISBN, it waits for the
+    whole load. on_done(message) is called on the loading thread at the end,
+    before any waiter is released.
+    """
+
+    def __init__(self, persistence: "PersistenceManager", per_isbn: bool,
+                 on_done: Callable[[str], None] | None = None):
+        self._persistence = persistence
+        self._catalog = persistence._catalog
+        self._per_isbn = per_isbn
+        self._on_done = on_done
+        self._lock = threading.Lock()
+        self._waiting: Dict[str, threading.Event] = {}
+        self._loans_loaded = threading.Event()
+        self._loads_seen = 0
+        self._done = threading.Event()
+        self.message: str | None = None
+
+        persistence.watch(self._loaded)
+        self._thread = threading.Thread(target=self._run, name="state-loader", daemon=True)
+        self._thread.start()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, isbn: str | None = None, timeout: float | None = None) -> bool:
+        """Blocks until `isbn` (or everything) has loaded; returns False if `timeout` ran out first."""
+        if isbn is None or not self._per_isbn:
+            return self._done.wait(timeout)
+        if not self._loans_loaded.wait(timeout):
+            return False
+        with self._lock:
+            event = self._waiting.setdefault(isbn, threading.Event())
+        # Registered before checking, so an item added in between still sets the event.
+        if self.done or self._catalog.get_item(isbn) is not None:
+            return True
+        return event.wait(timeout)
+
+    def _loaded(self, event: str, isbn: str | None):
+        if event == "load":
+            # load_state sends "load" when it empties the loans, then again when it loads them.
+            self._loads_seen += 1
+            if self._loads_seen == 2:
+                self._loans_loaded.set()
+        elif event == "add":
+            waiting = self._waiting.get(isbn)
+            if waiting is not None:
+                waiting.set()
+
+    def _run(self):
+        try:
+            self.message = self._persistence.load_state()
+            # Runs before waiters are released, so they see whatever on_done sets up.
+            if self._on_done:
+                self._on_done(self.message)
+        finally:
+            self._persistence.unwatch(self._loaded)
+            self._loans_loaded.set()
+            self._done.set()
+            with self._lock:
+                for event in self._waiting.values():
+                    event.set()
+
+
+class Journal:
+    """
+    An append-only log of state changes, one compact JSON record per line.
+
+    Records are written as they happen but only fsynced every `sync_every`
+    records (and on sync/close), so a crash can lose at most that many.
+    """
+
+    def __init__(self, path: Path, sync_every: int = 64):
+        self._path = path
+        self._sync_every = sync_every
+        self._pending = 0
+        self.records = 0  # records appended since this journal was opened or sealed
+        self._lock = threading.Lock()
+        # A crash may have left half a record at the end; appending onto it would
+        # make the first new record unreadable too.
+        _repair_journal_tail(path)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Appends one record and returns the bytes it took."""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._pending += 1
+            self.records += 1
+            if self._pending >= self._sync_every:
+                self._sync()
+        return len(line.encode('utf-8'))
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def seal(self, sealed_path: Path):
+        """Moves the records so far to `sealed_path` and starts an empty journal."""
+        with self._lock:
+            self._sync()
+            self._file.close()
+            _seal_journal(self._path, sealed_path)
+            self._file = open(self._path, 'a', encoding='utf-8')
+            self.records = 0
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._file.close()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    @staticmethod
+    def read(path: Path, errors: List[str] | None = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the records in a journal file.
+
+        Unreadable lines are skipped, and a reason for each is added to
+        `errors`: a torn final line left by a crash, or a damaged line anywhere
+        else, which does not stop the records after it from being read.
+        """
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    if errors is None:
+                        continue
+                    if line.endswith("\n"):
+                        errors.append(f"Skipped unreadable journal record at line {line_number} of {path}")
+                    else:
+                        errors.append(f"Skipped incomplete record at the end of journal {path} (line {line_number})")
+
 
 class PersistenceManager:
-    
-    def __init__(self, catalog: LibraryCatalog, loan_manager: LoanManager):
+
+    # Instances may point these at other files (the test suite does).
+    STATE_FILE = STATE_FILE
+    REPORT_FILE = REPORT_FILE
+    JOURNAL_FILE = JOURNAL_FILE
+    DELTA_FILE = DELTA_FILE
+    BINARY_STATE_FILE = BINARY_STATE_FILE
+
+    def __init__(self, catalog: LibraryCatalog, loan_manager: LoanManager,
+                 journal: bool = False, journal_sync_every: int = 64, compact_after: int | None = None,
+                 store: SQLiteStore | None = None, delta_saves: bool = False, delta_limit: float = 0.25,
+                 metrics: Metrics | None = None):
         self._catalog = catalog
+        # When set, saves, loads, imports and exports record their latency here, along
+        # with the bytes written and read and the rows and records skipped.
+        self.metrics = metrics
         self._loan_manager = loan_manager
+        # With a SQLite store the catalog writes its own items through (it must be a
+        # SQLiteCatalog on the same store) and loans are written through from here.
+        if store is not None and getattr(catalog, "store", None) is not store:
+            raise ValueError("A SQLite store needs a SQLiteCatalog backed by that store.")
+        self._store = store
+        if store is not None:
+            self.watch(self._store_change)
+        # Serializes writers of STATE_FILE (save_state, checkpoints and the autosave thread).
+        # Saves hold it from their snapshot to the end of their write, so an older
+        # snapshot can never be written over a newer one.
+        self._save_lock = threading.RLock()
+        # In journal mode every change is appended to JOURNAL_FILE (opened on first use),
+        # and STATE_FILE is only rewritten by checkpoint().
+        self._journal_enabled = journal
+        self._journal_sync_every = journal_sync_every
+        self._journal: Journal | None = None
+        self._loading = False
+        if journal:
+            self.watch(self._journal_change)
+        # With compact_after, a background checkpoint starts once the journal holds that many records.
+        if compact_after and not (journal and catalog.thread_safe):
+            raise ValueError("compact_after needs journal=True and a LibraryCatalog created with thread_safe=True.")
+        self._compact_after = compact_after
+        self._checkpoint_lock = threading.Lock()
+        self._checkpoint_thread: threading.Thread | None = None
+        self.last_checkpoint: Dict[str, float] | None = None
+        # With delta_saves, save_state writes only the items and loans changed since the last
+        # full snapshot to DELTA_FILE, tagged with that snapshot's generation. A full snapshot
+        # is written instead once the delta covers more than delta_limit of the catalog.
+        if delta_saves and (journal or store is not None):
+            raise ValueError("delta_saves cannot be combined with journal or store.")
+        self._delta_saves = delta_saves
+        self._delta_limit = delta_limit
+        self._delta_lock = threading.Lock()
+        self._changes = ChangeSet()
+        self._generation: str | None = None
+        self._delta_items: Set[str] = set()
+        self._delta_loans: Set[str] = set()
+        if delta_saves:
+            self.watch(self._changes)
+        # What the last snapshot or delta save wrote: mode, records, bytes and seconds.
+        self.last_save: Dict[str, Any] | None = None
+        # Why each record skipped by the last load_state was skipped.
+        self.load_errors: List[str] = []
+        # The same for the rows skipped by the last import_items_from_csv.
+        self.import_errors: List[str] = []
         
         if not DATA_DIR.exists():
             DATA_DIR.mkdir()
 
+    def _count(self, counter: str, amount: int):
+        if self.metrics is not None:
+            self.metrics.count(counter, amount)
+
+    @timed("save_state")
     def save_state(self) -> str:
         """Saves the current state of the catalog and loans to a JSON file."""
-        print(f"Attempting to save state to {STATE_FILE}...")
+        if self._store:
+            # Every change was committed to the database as it happened.
+            return f"System state successfully saved to {self._store.path}"
+        if self._journal_enabled:
+            # Every change is already in the journal; it only needs to reach the disk.
+            return self.sync_journal()
+        print(f"Attempting to save state to {self.STATE_FILE}...")
+        return self._write_state()
+
+    def _write_state(self) -> str:
+        """Writes a delta in delta mode, otherwise a full snapshot."""
+        if self._delta_saves:
+            return self._save_delta()
+        return self._write_snapshot()
+
+    def sync_journal(self) -> str:
         try:
-            state = {
-                "catalog_items": [item.to_dict() for item in self._catalog.all_items],
-                "checkouts": self._loan_manager.checkouts_to_dict()
+            if self._journal:
+                self._journal.sync()
+            return f"System state successfully saved to {self.JOURNAL_FILE}"
+        except IOError as e:
+            return f"ERROR: Failed to sync journal due to file operation error: {e}"
+
+    @property
+    def _sealed_journal_file(self) -> Path:
+        return self.JOURNAL_FILE.with_name(self.JOURNAL_FILE.name + ".old")
+
+    @timed("checkpoint")
+    def checkpoint(self) -> str:
+        """
+        Folds the journal into a new snapshot in STATE_FILE.
+
+        Changes are blocked only while the item list is copied and the journal
+        is sealed; the snapshot is written while changes continue, so it may
+        already show some newer changes. That is harmless because the new
+        journal replays over it idempotently. The sealed journal is deleted
+        once the new snapshot has been renamed into place.
+        """
+        with self._checkpoint_lock, self._save_lock:
+            start = time.perf_counter()
+            try:
+                with self._loan_manager.frozen():
+                    items = self._catalog.snapshot()
+                    checkouts = self._loan_manager.checkouts_to_dict()
+                    if self._journal:
+                        self._journal.seal(self._sealed_journal_file)
+                    else:
+                        _seal_journal(self.JOURNAL_FILE, self._sealed_journal_file)
+                paused = time.perf_counter()
+                swap_seconds = self._write_state_file((_state_record(item) for item in items), checkouts)
+                self._sealed_journal_file.unlink(missing_ok=True)
+            except IOError as e:
+                return f"ERROR: Failed to checkpoint state due to file operation error: {e}"
+            except Exception as e:
+                return f"ERROR: An unexpected error occurred during checkpoint: {e}"
+
+            self.last_checkpoint = {
+                "items": len(items),
+                "pause_ms": 1000 * (paused - start),
+                "write_seconds": time.perf_counter() - paused - swap_seconds,
+                "swap_ms": 1000 * swap_seconds,
             }
+            return f"System state successfully checkpointed to {self.STATE_FILE}"
+
+    def _maybe_start_checkpoint(self):
+        if not self._compact_after or self._journal.records < self._compact_after:
+            return
+        if self._checkpoint_thread and self._checkpoint_thread.is_alive():
+            return
+        self._checkpoint_thread = threading.Thread(target=self.checkpoint, name="checkpoint", daemon=True)
+        self._checkpoint_thread.start()
+
+    def close(self):
+        """Waits for a running checkpoint, then syncs and closes the journal, if one is open."""
+        if self._checkpoint_thread:
+            self._checkpoint_thread.join()
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+    def _write_snapshot(self) -> str:
+        try:
+            with self._save_lock:
+                # Copy the catalog and loans into plain dicts while changes are blocked.
+                with self._loan_manager.frozen():
+                    item_records = [_state_record(item) for item in self._catalog.snapshot()]
+                    checkouts = self._loan_manager.checkouts_to_dict()
+                start = time.perf_counter()
+                self._write_state_file(item_records, checkouts)
+                self._record_save("full", len(item_records) + len(checkouts), self.STATE_FILE, start)
             
-            with open(STATE_FILE, 'w', encoding='utf-8') as f:
-                json.dump(state, f, indent=4)
-            
-            return f"System state successfully saved to {STATE_FILE}"
+            return f"System state successfully saved to {self.STATE_FILE}"
         
         except IOError as e:
             return f"ERROR: Failed to save state due to file operation error: {e}"
@@ -40,37 +684,316 @@ class PersistenceManager:
             return f"ERROR: An unexpected error occurred during save: {e}"
 
 
-    def load_state(self) -> str:
-        """Loads the state of the catalog and loans from a JSON file."""
-        if not STATE_FILE.exists():
-            return f"INFO: State file not found at {STATE_FILE}. Starting with an empty state."
+    def _save_delta(self) -> str:
+        """Writes the changes since the last full snapshot to DELTA_FILE, or a new full snapshot."""
+        with self._delta_lock, self._save_lock:
+            try:
+                with self._loan_manager.frozen():
+                    items, loans, reset = self._changes.drain()
+                    self._delta_items |= items
+                    self._delta_loans |= loans
+                    full = (reset or self._generation is None
+                            or len(self._delta_items) > self._delta_limit * self._catalog.get_item_count())
+                    if full:
+                        item_records = [_state_record(item) for item in self._catalog.snapshot()]
+                        checkouts = self._loan_manager.checkouts_to_dict()
+                    else:
+                        item_records = {}
+                        for isbn in self._delta_items:
+                            item = self._catalog.get_item(isbn)
+                            item_records[isbn] = item.to_dict() if item else None
+                        current = self._loan_manager.get_current_checkouts()
+                        checkouts = {isbn: {"user": current[isbn]["user"],
+                                            "due_date": current[isbn]["due_date"].isoformat()}
+                                     if isbn in current else None
+                                     for isbn in self._delta_loans}
+
+                start = time.perf_counter()
+                if full:
+                    generation = f"{time.time_ns():x}"
+                    self._write_state_file(item_records, checkouts, generation)
+                    # A delta left over from the old snapshot no longer matches its generation.
+                    self.DELTA_FILE.unlink(missing_ok=True)
+                    self._generation = generation
+                    self._delta_items, self._delta_loans = set(), set()
+                    self._record_save("full", len(item_records) + len(checkouts), self.STATE_FILE, start)
+                    return f"System state successfully saved to {self.STATE_FILE}"
+
+                delta = {"base": self._generation, "items": item_records, "checkouts": checkouts}
+                self._atomic_write(self.DELTA_FILE, lambda f: f.write(json.dumps(delta).encode('utf-8')))
+                self._record_save("delta", len(item_records) + len(checkouts), self.DELTA_FILE, start)
+                return f"System state successfully saved to {self.DELTA_FILE}"
+
+            except Exception as e:
+                # What was drained may not be on disk; the next save starts from a full snapshot.
+                self._generation = None
+                if isinstance(e, IOError):
+                    return f"ERROR: Failed to save state due to file operation error: {e}"
+                return f"ERROR: An unexpected error occurred during save: {e}"
+
+    def _record_save(self, mode: str, records: int, path: Path, start: float):
+        self.last_save = {"mode": mode, "records": records, "bytes": path.stat().st_size,
+                          "seconds": time.perf_counter() - start}
+
+    def _apply_delta(self, generation: str | None, checkouts: Dict[str, Dict]) -> int:
+        """
+        Applies DELTA_FILE over the items just loaded and over `checkouts`, if the
+        delta was written against snapshot `generation`. Returns the records applied.
+        """
+        self._generation = generation
+        self._delta_items, self._delta_loans = set(), set()
+        if generation is None or not self.DELTA_FILE.exists():
+            return 0
+        with open(self.DELTA_FILE, 'r', encoding='utf-8') as f:
+            delta = json.load(f)
+        self._count("bytes_read", self.DELTA_FILE.stat().st_size)
+        if delta.get("base") != generation:
+            return 0
+
+        for isbn, item_data in delta["items"].items():
+            self._catalog.remove_item(isbn)
+            item = self._item_from_record(item_data) if item_data is not None else None
+            if item is not None:
+                self._catalog.add_item(item)
+        for isbn, loan in delta["checkouts"].items():
+            if loan is None:
+                checkouts.pop(isbn, None)
+            else:
+                checkouts[isbn] = loan
+        # Later deltas still have to carry these changes until the next full snapshot.
+        self._delta_items.update(delta["items"])
+        self._delta_loans.update(delta["checkouts"])
+        return len(delta["items"]) + len(delta["checkouts"])
 
-        print(f"Attempting to load state from {STATE_FILE}...")
+    def _write_state_file(self, item_records: Iterable[Dict[str, Any] | str], checkouts: Dict[str, Dict],
+                          generation: str | None = None) -> float:
+        """
+        Streams the state to STATE_FILE, one item per line. Returns the seconds spent on the rename.
+
+        A record that is already JSON text (see _state_record) is written unchanged.
+        `generation` identifies the snapshot for the deltas written against it.
+        """
+        def write(f):
+            # The loans come first, so a background load has them before any item arrives.
+            f.write(('{\n    "checkouts": ' + json.dumps(checkouts) + ',\n    "catalog_items": [').encode('utf-8'))
+            separator = "\n        "
+            for record in item_records:
+                text = record if isinstance(record, str) else json.dumps(record)
+                f.write((separator + text).encode('utf-8'))
+                separator = ",\n        "
+            f.write(b'\n    ]')
+            if generation is not None:
+                f.write((',\n    "generation": ' + json.dumps(generation)).encode('utf-8'))
+            f.write(b'\n}\n')
+
+        return self._atomic_write(self.STATE_FILE, write)
+
+    def _atomic_write(self, path: Path, write) -> float:
+        """
+        Calls write(f) on a temp file, fsyncs it and renames it over `path`.
+
+        A crash at any point leaves either the old or the new file, never a
+        truncated one. Returns the seconds spent on the rename.
+        """
+        tmp_path = path.with_name(path.name + ".tmp")
+        with self._save_lock:
+            try:
+                with open(tmp_path, 'wb') as f:
+                    write(f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                start = time.perf_counter()
+                os.replace(tmp_path, path)
+                _fsync_dir(path.parent)
+                self._count("bytes_written", path.stat().st_size)
+                return time.perf_counter() - start
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+    def save_binary_state(self) -> str:
+        """Saves the state in the binary format that binary_state.MappedCatalog can map."""
         try:
-            with open(STATE_FILE, 'r', encoding='utf-8') as f:
-                state = json.load(f)
+            with self._save_lock:
+                with self._loan_manager.frozen():
+                    item_records = [_state_record(item) for item in self._catalog.snapshot()]
+                    checkouts = self._loan_manager.checkouts_to_dict()
+                item_records = [json.loads(record) if isinstance(record, str) else record
+                                for record in item_records]
+                self._atomic_write(self.BINARY_STATE_FILE,
+                                   lambda f: binary_state.write_state(f, item_records, checkouts))
+            return f"System state successfully saved to {self.BINARY_STATE_FILE}"
+        except IOError as e:
+            return f"ERROR: Failed to save binary state due to file operation error: {e}"
+        except Exception as e:
+            return f"ERROR: An unexpected error occurred during binary save: {e}"
 
-            loaded_count = 0
-            self._catalog._items.clear() 
-            
-            #  Load Catalog Items 
-            for item_data in state.get("catalog_items", []):
-                item_type = item_data.get("type")
-                if item_type in ITEM_CLASS_MAP:
-                    try:
-                        ItemClass = ITEM_CLASS_MAP[item_type]
-                        item = ItemClass.from_dict(item_data)
-                        self._catalog.add_item(item)
-                        loaded_count += 1
-                    except Exception as e:
-                        print(f"WARNING: Skipping corrupted item '{item_data.get('title', 'Unknown')}' due to error: {e}")
+    def start_autosave(self, delay: float = 1.0, max_delay: float = 10.0) -> "AutosaveWorker":
+        """Starts a background thread that saves the state shortly after it changes."""
+        if not self._catalog.thread_safe:
+            raise ValueError("Autosave needs a LibraryCatalog created with thread_safe=True.")
+        return AutosaveWorker(self, delay, max_delay)
+
+    def load_state_in_background(self, on_done: Callable[[str], None] | None = None) -> "BackgroundLoad":
+        """Starts load_state on a background thread and returns at once; see BackgroundLoad."""
+        if not self._catalog.thread_safe:
+            raise ValueError("A background load needs a LibraryCatalog created with thread_safe=True.")
+        # A journal or delta is applied after the snapshot, and a lazy or SQLite catalog
+        # does not announce each item, so only a plain snapshot load can be awaited per ISBN.
+        per_isbn = not (self._journal_enabled or self._delta_saves or self._store
+                        or isinstance(self._catalog, LazyCatalog))
+        return BackgroundLoad(self, per_isbn, on_done)
+
+    def watch(self, listener):
+        self._catalog.add_listener(listener)
+        self._loan_manager.add_listener(listener)
+
+    def unwatch(self, listener):
+        self._catalog.remove_listener(listener)
+        self._loan_manager.remove_listener(listener)
+
+    def _journal_change(self, event: str, isbn: str | None):
+        if self._loading:
+            return
+        if event in ("add", "update"):
+            record = {"op": event, "item": self._catalog.get_item(isbn).to_dict()}
+        elif event == "checkout":
+            loan = self._loan_manager.get_current_checkouts()[isbn]
+            record = {"op": event, "isbn": isbn, "user": loan["user"], "due_date": loan["due_date"].isoformat()}
+        elif event == "load":
+            record = {"op": event, "checkouts": self._loan_manager.checkouts_to_dict()}
+        elif event == "clear":
+            record = {"op": event}
+        else:
+            record = {"op": event, "isbn": isbn}
+
+        try:
+            if self._journal is None:
+                self._journal = Journal(self.JOURNAL_FILE, self._journal_sync_every)
+            self._count("bytes_written", self._journal.append(record))
+            self._maybe_start_checkpoint()
+        except IOError as e:
+            print(f"ERROR: Failed to journal '{event}' for {isbn}: {e}")
+
+    def _store_change(self, event: str, isbn: str | None):
+        if self._loading:
+            return
+        if event == "checkout":
+            loan = self._loan_manager.get_current_checkouts()[isbn]
+            self._store.save_loan(isbn, loan["user"], loan["due_date"].isoformat())
+        elif event == "return":
+            self._store.delete_loan(isbn)
+        elif event == "load":
+            self._store.replace_loans(self._loan_manager.checkouts_to_dict())
+
+    def _replay_journal(self, path: Path) -> int:
+        """Applies a journal on top of the loaded snapshot. Records are safe to apply twice."""
+        replayed = 0
+        self._count("bytes_read", path.stat().st_size)
+        for record in Journal.read(path, self.load_errors):
+            op = record.get("op")
+            try:
+                if op in ("add", "update"):
+                    item_data = record["item"]
+                    self._catalog.remove_item(item_data["isbn"])
+                    self._catalog.add_item(ITEM_CLASS_MAP[item_data["type"]].from_dict(item_data))
+                elif op == "remove":
+                    self._catalog.remove_item(record["isbn"])
+                elif op == "checkout":
+                    due_date = datetime.strptime(record["due_date"], '%Y-%m-%d').date()
+                    self._loan_manager.restore_checkout(record["isbn"], record["user"], due_date)
+                elif op == "return":
+                    self._loan_manager.return_item(record["isbn"])
+                elif op == "clear":
+                    self._catalog.clear()
+                elif op == "load":
+                    self._loan_manager.load_checkouts_from_dict(record["checkouts"])
                 else:
-                    print(f"WARNING: Skipping unknown item type: {item_type}")
+                    self.load_errors.append(f"Skipped unknown journal record: {op}")
+                    continue
+                replayed += 1
+            except Exception as e:
+                self.load_errors.append(f"Skipped corrupted journal record '{op}' due to error: {e}")
+        return replayed
+
+    @timed("load_state")
+    def load_state(self) -> str:
+        """Loads the state of the catalog and loans from a JSON file, plus the journal in journal mode."""
+        if self._store:
+            # The items stay in the database; only the loans are brought into memory.
+            self._loading = True
+            try:
+                self._loan_manager.load_checkouts_from_dict(self._store.load_checkouts())
+            finally:
+                self._loading = False
+            return f"System state loaded successfully. Restored {self._catalog.get_item_count()} items."
+
+        # A sealed journal is left behind when a checkpoint did not finish; it comes first.
+        journals = [path for path in (self._sealed_journal_file, self.JOURNAL_FILE) if path.exists()]
+        has_journal = self._journal_enabled and bool(journals)
+        if not self.STATE_FILE.exists() and not has_journal:
+            return f"INFO: State file not found at {self.STATE_FILE}. Starting with an empty state."
+
+        print(f"Attempting to load state from {self.STATE_FILE}...")
+        # Loading replaces the current state, even if the file turns out to be unreadable.
+        self._loading = True
+        self.load_errors = []
+        self._generation = None
+        self._catalog.clear()
+        self._loan_manager.load_checkouts_from_dict({})
+        try:
+            loaded_count = 0
+            checkouts = {}
+            loans_loaded = False
+            generation = None
+            if self.STATE_FILE.exists():
+                # Items are parsed and handed to add_many one at a time, so the raw text
+                # and the parsed document never have to be held in memory whole.
+                # A LazyCatalog is given each item's JSON text instead of a built item.
+                lazy = isinstance(self._catalog, LazyCatalog)
+                self._count("bytes_read", self.STATE_FILE.stat().st_size)
+                with open(self.STATE_FILE, 'r', encoding='utf-8') as f:
+                    def saved_items():
+                        nonlocal generation, loans_loaded
+                        for key, value in iter_state_file(f, raw_items=lazy):
+                            if key == "catalog_items":
+                                item = self._raw_record(*value) if lazy else self._item_from_record(value)
+                                if item is not None:
+                                    yield item
+                            elif key == "checkouts" and not self._delta_saves:
+                                # Loaded as soon as they are read; a delta may still change them.
+                                self._loan_manager.load_checkouts_from_dict(value)
+                                loans_loaded = True
+                            elif key == "checkouts":
+                                checkouts.update(value)
+                            elif key == "generation":
+                                generation = value
+
+                    if lazy:
+                        report = self._catalog.add_raw_records(saved_items())
+                    else:
+                        report = self._catalog.add_many(saved_items(), on_conflict="skip")
+                loaded_count = report["added"]
+                self.load_errors.extend(f"Skipped item {rejected['isbn']}: {rejected['reason']}"
+                                        for rejected in report["rejected"])
+
+            applied = self._apply_delta(generation, checkouts) if self._delta_saves else 0
 
             #  Load Loan State
-            self._loan_manager.load_checkouts_from_dict(state.get("checkouts", {}))
+            if not loans_loaded:
+                self._loan_manager.load_checkouts_from_dict(checkouts)
+            # The load itself is not a change to save.
+            self._changes.drain()
 
-            return f"System state loaded successfully. Restored {loaded_count} items."
+            message = f"System state loaded successfully. Restored {loaded_count} items."
+            if applied:
+                message += f" Applied {applied} delta records."
+            if has_journal:
+                replayed = sum(self._replay_journal(path) for path in journals)
+                message += f" Replayed {replayed} journal records."
+            if self.load_errors:
+                message += f" Skipped {len(self.load_errors)} records (see load_errors)."
+            self._count("load_records_skipped", len(self.load_errors))
+            return message
 
         except json.JSONDecodeError as e:
             return f"ERROR: Failed to load state. File is corrupted/invalid JSON: {e}"
@@ -78,86 +1001,144 @@ class PersistenceManager:
             return f"ERROR: Failed to load state due to file operation error: {e}"
         except Exception as e:
             return f"ERROR: An unexpected error occurred during load: {e}"
+        finally:
+            self._loading = False
+
+    def _raw_record(self, item_data: Dict[str, Any], text: str) -> Tuple[str, str] | None:
+        """
+        Checks one saved item for a LazyCatalog and returns (isbn, json_text), or None if it was skipped.
+
+        The record is not built, but it is held to what building it needs, so
+        a lazy load skips the same records as an eager one and get_item never
+        meets one it cannot build.
+        """
+        item_type = item_data.get("type") if isinstance(item_data, dict) else None
+        if item_type not in ITEM_CLASS_MAP:
+            self.load_errors.append(f"Skipped unknown item type: {item_type}")
+            return None
+        isbn = item_data.get("isbn")
+        if not isbn or not isinstance(isbn, str):
+            self.load_errors.append(f"Skipped corrupted item '{item_data.get('title', 'Unknown')}': missing ISBN")
+            return None
+        missing = [field for field in ITEM_FIELDS[item_type] if field not in item_data]
+        if missing or not (item_data["title"] and item_data["year"]):
+            reason = f"missing {', '.join(missing)}" if missing else "Title, ISBN, and Year must be provided."
+            self.load_errors.append(f"Skipped corrupted item '{item_data.get('title', 'Unknown')}' due to error: {reason}")
+            return None
+        # Items from the older indented layout are re-encoded to keep one item per line.
+        return isbn, json.dumps(item_data) if "\n" in text else text
+
+    def _item_from_record(self, item_data: Dict[str, Any]) -> LibraryItem | None:
+        """Builds one saved item, or records why it was skipped and returns None."""
+        item_type = item_data.get("type") if isinstance(item_data, dict) else None
+        if item_type not in ITEM_CLASS_MAP:
+            self.load_errors.append(f"Skipped unknown item type: {item_type}")
+            return None
+        try:
+            return ITEM_CLASS_MAP[item_type].from_dict(item_data)
+        except Exception as e:
+            self.load_errors.append(f"Skipped corrupted item '{item_data.get('title', 'Unknown')}' due to error: {e}")
+            return None
+
+    @timed("import_items_from_csv")
+    def import_items_from_csv(self, file_path: str, workers: int = 1,
+                              on_conflict: str = "skip") -> Tuple[int, str]:
+        """
+        Imports items from a CSV file into the catalog.
+
+        Rows that cannot be imported are listed in import_errors. on_conflict
+        is passed to LibraryCatalog.add_many; with "replace" the imported row
+        wins over an item already in the catalog, though an item on loan stays on loan.
 
-    def import_items_from_csv(self, file_path: str) -> Tuple[int, str]:
-        """Imports items from a CSV file into the catalog."""
+        With workers > 1 the rows are split into byte ranges on line breaks and
+        parsed in a process pool; the items are still added here, in file order.
+        That assumes no quoted field contains a line break, which holds for the
+        vendor exports this mode is meant for.
+        """
         path = Path(file_path)
         if not path.exists():
             return 0, f"ERROR: Import file not found at {path}"
 
-        imported_count = 0
+        self.import_errors = []
         try:
-            with open(path, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                # Check for required fields for primary lookup
-                if 'type' not in reader.fieldnames or 'isbn' not in reader.fieldnames:
-                    return 0, "ERROR: CSV file is missing 'type' or 'isbn' column."
-
-                for row in reader:
-                    # Skip rows that cannot be mapped or identified
-                    if row.get('type') not in ITEM_CLASS_MAP or not row.get('isbn'):
-                        print(f"WARNING: Skipping row with unknown type or missing ISBN: {row.get('isbn')}")
-                        continue
-                    
-                    item_type = row['type']
-                    
-                    try:
-
-                        # Use a default year (e.g., 0) if the year is missing/invalid to allow the loop to continue if necessary
-                        year = int(row.get('year') or 0) 
-                        
-                        # 2. Use the specific constructor for each type
-                        if item_type == "Book":
-                            item = Book(row['title'], row['isbn'], year, row['author'], row['genre'])
-                        elif item_type == "DVD":
-                            # Use .get() for director as it might be missing
-                            item = DVD(row['title'], row['isbn'], year, row.get('director', 'N/A'))
-                        elif item_type == "EBook":
-                            # Safely cast file_size to float, using 0.0 if the string is empty/missing
-                            file_size = float(row.get('file_size') or 0.0)
-                            item = EBook(row['title'], row['isbn'], year, row['author'], file_size)
-                        else:
-                            # Should be caught by the initial check, but good for safety
-                            continue 
-                        
-                        self._catalog.add_item(item)
-                        imported_count += 1
-                    except ValueError as ve:
-                        # Catches int('YearFail') and float('') errors, allowing the loop to continue
-                        print(f"WARNING: Skipping row {row.get('isbn')} due to incomplete/invalid data for model: {ve}")
-                    except Exception as e:
-                        # Catches other unexpected errors during item creation/addition
-                        print(f"WARNING: Skipping row {row.get('isbn')} due to creation/addition error: {e}")
-
-            return imported_count, f"Successfully imported {imported_count} items from {file_path}."
+            with open(path, 'rb') as f:
+                header = f.readline()
+                data_start = f.tell()
+            fieldnames = next(csv.reader([header.decode('utf-8')]), [])
+            # Check for required fields for primary lookup
+            if 'type' not in fieldnames or 'isbn' not in fieldnames:
+                return 0, "ERROR: CSV file is missing 'type' or 'isbn' column."
+
+            if workers > 1:
+                results = self._parse_csv_in_parallel(path, data_start, fieldnames, workers)
+            else:
+                csvfile = open(path, 'r', newline='', encoding='utf-8')
+                results = _items_from_csv_rows(csv.DictReader(csvfile))
+
+            def parsed_items():
+                for item, warning in results:
+                    if warning:
+                        self.import_errors.append(warning)
+                    else:
+                        yield item
+
+            try:
+                # A store commits the whole import in one transaction.
+                with self._store.transaction() if self._store else nullcontext():
+                    report = self._catalog.add_many(parsed_items(), on_conflict=on_conflict)
+            finally:
+                if workers <= 1:
+                    csvfile.close()
+
+            self.import_errors.extend(f"WARNING: Skipping row {rejected['isbn']}: {rejected['reason']}"
+                                      for rejected in report["rejected"])
+            imported_count = report["added"] + report["replaced"]
+            self._count("bytes_read", path.stat().st_size)
+            self._count("import_rows_imported", imported_count)
+            self._count("import_rows_skipped", len(self.import_errors))
+            message = f"Successfully imported {imported_count} items from {file_path}."
+            if self.import_errors:
+                message += f" Skipped {len(self.import_errors)} rows (see import_errors)."
+            return imported_count, message
 
         except IOError as e:
             return 0, f"ERROR: Failed to read CSV file: {e}"
         except Exception as e:
             return 0, f"ERROR: An unexpected error occurred during import: {e}"
 
-    def export_loan_report(self) -> str:
-        """Generates and saves a plain text report of all current loans."""
-        checkouts = self._loan_manager.get_current_checkouts()
-        if not checkouts:
-            return "No items are currently checked out."
+    def _parse_csv_in_parallel(self, path: Path, data_start: int, fieldnames: List[str],
+                               workers: int) -> Iterator[Tuple[LibraryItem | None, str | None]]:
+        # A few chunks per worker keeps the pool busy when rows parse at uneven speeds.
+        chunks = _csv_chunks(path, data_start, workers * 4)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_parse_csv_chunk, str(path), start, end, fieldnames) for start, end in chunks]
+            for future in futures:
+                yield from future.result()
 
-        report_lines = ["--- Current Loan Report ---"]
-        report_lines.append(f"Generated: {date.today().isoformat()}")
-        report_lines.append("-" * 30)
-        report_lines.append(f"{'ISBN':<15}{'Title':<30}{'User':<15}{'Due Date':<10}")
-        report_lines.append("-" * 70)
+    @timed("export_loan_report")
+    def export_loan_report(self, report_format: str = "text", sort_by_due_date: bool = False,
+                           path: Path | None = None) -> str:
+        """
+        Writes a report of all current loans as plain text, CSV or JSON Lines.
 
-        for isbn, loan_data in checkouts.items():
-            item = self._catalog.get_item(isbn)
-            title = (item.title[:27] + '...') if item and len(item.title) > 30 else (item.title if item else "Unknown Title")
-            due_date = loan_data['due_date'].isoformat()
-            
-            report_lines.append(f"{isbn:<15}{title:<30}{loan_data['user']:<15}{due_date:<10}")
+        Rows go through a buffered writer as they are produced, so memory stays
+        flat however many loans there are. The default path is REPORT_FILE with
+        the suffix of the format.
+        """
+        if report_format not in REPORT_SUFFIXES:
+            return f"ERROR: Unknown report format '{report_format}'. Use one of: {', '.join(REPORT_SUFFIXES)}."
+        if not self._loan_manager.get_current_checkouts():
+            return "No items are currently checked out."
 
+        path = Path(path) if path else self.REPORT_FILE.with_suffix(REPORT_SUFFIXES[report_format])
         try:
-            with open(REPORT_FILE, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(report_lines))
-            return f"Loan report successfully exported to {REPORT_FILE}"
+            with open(path, 'w', encoding='utf-8', newline='', buffering=REPORT_BUFFER_SIZE) as f:
+                write_row = _loan_report_writer(f, report_format)
+                for isbn, loan_data in self._loan_manager.iter_loans(by_due_date=sort_by_due_date):
+                    item = self._catalog.get_item(isbn)
+                    write_row(isbn, item.title if item else "Unknown Title", loan_data['user'],
+                              loan_data['due_date'].isoformat())
+            self._count("bytes_written", path.stat().st_size)
+            return f"Loan report successfully exported to {path}"
         except IOError as e:
-            return f"ERROR: Failed to write export file: {e}"
\ No newline at end of file
+            return f"ERROR: Failed to write export file: {e}"
@@ -0,0 +1,395 @@
+"""SQLite storage for the catalog and loans.
+
+SQLiteStore owns the database: WAL mode, indexes on every field the catalog
+can be queried by, and a small pool of connections shared between threads.
+SQLiteCatalog is a LibraryCatalog whose items live in the database rather
+than in memory; it only keeps a bounded cache of recently used items.
+Loans are written through by PersistenceManager (see its `store` argument).
+"""
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Set
+
+from library_model import ITEM_CLASS_MAP, CatalogCursor, LibraryCatalog, LibraryItem
+
+ITEM_COLUMNS = ("isbn", "type", "title", "year", "available", "author", "genre", "director", "file_size")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    isbn TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    year INTEGER,
+    available INTEGER NOT NULL,
+    author TEXT,
+    genre TEXT,
+    director TEXT,
+    file_size REAL
+);
+CREATE INDEX IF NOT EXISTS items_type ON items (type);
+CREATE INDEX IF NOT EXISTS items_author ON items (author);
+CREATE INDEX IF NOT EXISTS items_genre ON items (genre);
+CREATE INDEX IF NOT EXISTS items_director ON items (director);
+CREATE INDEX IF NOT EXISTS items_year ON items (year);
+CREATE TABLE IF NOT EXISTS loans (
+    isbn TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    due_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS loans_user ON loans (user);
+CREATE INDEX IF NOT EXISTS loans_due_date ON loans (due_date);
+"""
+
+# Statements are kept as constants so each connection's statement cache reuses them.
+INSERT_ITEM = f"INSERT INTO items ({', '.join(ITEM_COLUMNS)}) VALUES ({', '.join('?' * len(ITEM_COLUMNS))})"
+UPSERT_ITEM = INSERT_ITEM.replace("INSERT", "INSERT OR REPLACE", 1)
+SELECT_ITEMS = f"SELECT {', '.join(ITEM_COLUMNS)} FROM items"
+
+
+def _item_row(record: Dict[str, Any]) -> tuple:
+    return tuple(record.get(column) for column in ITEM_COLUMNS)
+
+
+def _row_item(row: tuple) -> LibraryItem:
+    data = dict(zip(ITEM_COLUMNS, row))
+    data["available"] = bool(data["available"])
+    return ITEM_CLASS_MAP[data["type"]].from_dict(data)
+
+
+class SQLiteStore:
+    """A SQLite database of items and loans, safe to share between threads."""
+
+    def __init__(self, path: Path, pool_size: int = 4, timeout: float = 30.0):
+        self.path = Path(path)
+        self._timeout = timeout
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        self._local = threading.local()
+        self._connections = [self._connect() for _ in range(pool_size)]
+        for connection in self._connections:
+            self._pool.put(connection)
+        with self._connection() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: each statement commits on its own unless inside transaction().
+        connection = sqlite3.connect(self.path, timeout=self._timeout, isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            # This thread is inside transaction(); keep using its connection.
+            yield connection
+            return
+        connection = self._pool.get()
+        try:
+            yield connection
+        finally:
+            self._pool.put(connection)
+
+    @contextmanager
+    def transaction(self):
+        """Runs every store call this thread makes inside the block as one transaction."""
+        if getattr(self._local, "connection", None) is not None:
+            yield
+            return
+        connection = self._pool.get()
+        self._local.connection = connection
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            self._local.connection = None
+            self._pool.put(connection)
+
+    def close(self):
+        for connection in self._connections:
+            connection.close()
+
+    #  Items
+
+    def insert_item(self, record: Dict[str, Any]):
+        """Inserts an item; raises ValueError if its ISBN is already stored."""
+        try:
+            with self._connection() as connection:
+                connection.execute(INSERT_ITEM, _item_row(record))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Item with ISBN {record['isbn']} already exists.") from None
+
+    def insert_items(self, records: Iterable[Dict[str, Any]], on_conflict: str = "error") -> Set[int]:
+        """
+        Inserts items in one transaction and returns the positions of the records
+        whose ISBN was already stored (possibly by an earlier record of the same call).
+
+        Those rows are skipped ("skip"), overwritten ("replace") or, for "error",
+        roll the whole transaction back with ValueError.
+        """
+        conflicts = set()
+        with self.transaction(), self._connection() as connection:
+            for position, record in enumerate(records):
+                row = _item_row(record)
+                if connection.execute("SELECT 1 FROM items WHERE isbn = ?", (row[0],)).fetchone():
+                    if on_conflict == "error":
+                        raise ValueError(f"Item with ISBN {row[0]} already exists.")
+                    conflicts.add(position)
+                    if on_conflict == "skip":
+                        continue
+                    connection.execute(UPSERT_ITEM, row)
+                else:
+                    connection.execute(INSERT_ITEM, row)
+        return conflicts
+
+    def save_item(self, record: Dict[str, Any]):
+        with self._connection() as connection:
+            connection.execute(UPSERT_ITEM, _item_row(record))
+
+    def set_available(self, isbn: str, available: bool):
+        with self._connection() as connection:
+            connection.execute("UPDATE items SET available = ? WHERE isbn = ?", (int(available), isbn))
+
+    def delete_item(self, isbn: str):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM items WHERE isbn = ?", (isbn,))
+
+    def clear_items(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM items")
+
+    def get_item(self, isbn: str) -> LibraryItem | None:
+        with self._connection() as connection:
+            row = connection.execute(f"{SELECT_ITEMS} WHERE isbn = ?", (isbn,)).fetchone()
+        return _row_item(row) if row else None
+
+    def iter_items(self, batch_size: int = 1000, item_type: str | None = None, available: bool | None = None,
+                   offset: int = 0) -> Iterator[LibraryItem]:
+        """
+        Yields the items matching the filters in ISBN order, fetching rows in batches rather than all at once.
+
+        Each batch is its own query that starts after the last ISBN of the one
+        before, so the pooled connection is handed back between batches and a
+        generator that is never finished does not keep one checked out.
+        """
+        conditions, params = [], []
+        if item_type is not None:
+            conditions.append("type = ?")
+            params.append(item_type)
+        if available is not None:
+            conditions.append("available = ?")
+            params.append(int(available))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        after = f"{where} AND isbn > ?" if conditions else " WHERE isbn > ?"
+        with self._connection() as connection:
+            rows = connection.execute(f"{SELECT_ITEMS}{where} ORDER BY isbn LIMIT ? OFFSET ?",
+                                      (*params, batch_size, offset)).fetchall()
+        while rows:
+            for row in rows:
+                yield _row_item(row)
+            if len(rows) < batch_size:
+                return
+            with self._connection() as connection:
+                rows = connection.execute(f"{SELECT_ITEMS}{after} ORDER BY isbn LIMIT ?",
+                                          (*params, rows[-1][0], batch_size)).fetchall()
+
+    def count_items(self) -> int:
+        with self._connection() as connection:
+            return connection.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def find_isbns(self, column: str, value) -> Set[str]:
+        if column not in ITEM_COLUMNS:
+            raise ValueError(f"Unknown column '{column}'.")
+        with self._connection() as connection:
+            rows = connection.execute(f"SELECT isbn FROM items WHERE {column} = ?", (value,)).fetchall()
+        return {row[0] for row in rows}
+
+    #  Loans
+
+    def save_loan(self, isbn: str, user_name: str, due_date: str):
+        """Records a loan and marks the item checked out, in one transaction."""
+        with self.transaction(), self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO loans (isbn, user, due_date) VALUES (?, ?, ?)",
+                               (isbn, user_name, due_date))
+            connection.execute("UPDATE items SET available = 0 WHERE isbn = ?", (isbn,))
+
+    def delete_loan(self, isbn: str):
+        """Deletes a loan and marks the item available, in one transaction."""
+        with self.transaction(), self._connection() as connection:
+            connection.execute("DELETE FROM loans WHERE isbn = ?", (isbn,))
+            connection.execute("UPDATE items SET available = 1 WHERE isbn = ?", (isbn,))
+
+    def replace_loans(self, checkouts: Dict[str, Dict]):
+        with self.transaction(), self._connection() as connection:
+            connection.execute("DELETE FROM loans")
+            connection.executemany("INSERT INTO loans (isbn, user, due_date) VALUES (?, ?, ?)",
+                                   ((isbn, loan["user"], loan["due_date"]) for isbn, loan in checkouts.items()))
+
+    def load_checkouts(self) -> Dict[str, Dict]:
+        """Returns the loans in the form LoanManager.load_checkouts_from_dict takes."""
+        with self._connection() as connection:
+            rows = connection.execute("SELECT isbn, user, due_date FROM loans").fetchall()
+        return {isbn: {"user": user, "due_date": due_date} for isbn, user, due_date in rows}
+
+
+class SQLiteCatalog(LibraryCatalog):
+    """
+    A LibraryCatalog whose items are stored in SQLite and written through on every change.
+
+    Only the `cache_size` most recently used items are kept in memory, so the
+    catalog can be much larger than RAM. find_isbns uses the table's indexes.
+    """
+
+    def __init__(self, store: SQLiteStore, cache_size: int = 10_000, thread_safe: bool = False):
+        super().__init__(thread_safe=thread_safe)
+        self.store = store
+        self._cache: "OrderedDict[str, LibraryItem]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+
+    def _remember(self, item: LibraryItem):
+        with self._cache_lock:
+            self._cache[item.isbn] = item
+            self._cache.move_to_end(item.isbn)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget(self, isbn: str):
+        with self._cache_lock:
+            self._cache.pop(isbn, None)
+
+    def add_item(self, item: LibraryItem):
+        with self._write_lock:
+            self.store.insert_item(item.to_dict())
+            self._remember(item)
+            self._notify("add", item.isbn)
+
+    def add_many(self, items: Iterable[LibraryItem], on_conflict: str = "error") -> Dict[str, Any]:
+        """Adds items in one database transaction; see LibraryCatalog.add_many."""
+        if on_conflict not in self.CONFLICT_POLICIES:
+            raise ValueError(f"Unknown conflict policy '{on_conflict}'.")
+        items = list(items)
+        with self.frozen() if on_conflict == "replace" else self._write_lock:
+            if on_conflict == "replace":
+                # Keep loans across the replacement, as LibraryCatalog.add_many does.
+                for item in items:
+                    existing = self.get_item_for_loan(item.isbn)
+                    if existing is not None:
+                        item.available = existing.available
+            conflicts = self.store.insert_items((item.to_dict() for item in items), on_conflict)
+            report = {"added": 0, "replaced": 0, "rejected": []}
+            for position, item in enumerate(items):
+                if position not in conflicts:
+                    report["added"] += 1
+                    self._remember(item)
+                    self._notify("add", item.isbn)
+                elif on_conflict == "skip":
+                    report["rejected"].append({"isbn": item.isbn, "reason": "duplicate ISBN"})
+                else:
+                    report["replaced"] += 1
+                    self._remember(item)
+                    self._notify("update", item.isbn)
+        return report
+
+    def remove_item(self, isbn: str) -> LibraryItem | None:
+        with self.item_lock(isbn), self._write_lock:
+            item = self.get_item(isbn)
+            if item:
+                self.store.delete_item(isbn)
+                self._forget(isbn)
+                self._notify("remove", isbn)
+            return item
+
+    def update_item(self, isbn: str, **changes) -> LibraryItem:
+        """Changes fields of a stored item and writes the row back."""
+        item = self.get_item(isbn)
+        if not item:
+            raise KeyError(f"Item with ISBN {isbn} not found.")
+        if "isbn" in changes:
+            raise ValueError("The ISBN of a catalogued item cannot be changed.")
+        for field in changes:
+            if not hasattr(item, field):
+                raise AttributeError(f"{item.__class__.__name__} has no field '{field}'.")
+
+        with self.item_lock(isbn), self._write_lock:
+            for field, value in changes.items():
+                setattr(item, field, value)
+            self.store.save_item(item.to_dict())
+            self._notify("update", isbn)
+        return item
+
+    def clear(self):
+        with self._write_lock:
+            self.store.clear_items()
+            with self._cache_lock:
+                self._cache.clear()
+            self._notify("clear")
+
+    def get_item(self, isbn) -> LibraryItem | None:
+        with self._cache_lock:
+            item = self._cache.get(isbn)
+            if item is not None:
+                self._cache.move_to_end(isbn)
+                return item
+        item = self.store.get_item(isbn)
+        if item is not None:
+            self._remember(item)
+        return item
+
+    def get_item_for_loan(self, isbn) -> LibraryItem | None:
+        """
+        Returns the item with its availability read from its row.
+
+        The cache is not the only holder of an item: an evicted object, or one
+        built by a concurrent miss, may still be in use. So the row, which
+        save_availability writes under the same item lock, decides whether the
+        item is on loan, whichever object the caller ends up with.
+        """
+        stored = self.store.get_item(isbn)
+        if stored is None:
+            self._forget(isbn)
+            return None
+        with self._cache_lock:
+            item = self._cache.get(isbn)
+        if item is None:
+            self._remember(stored)
+            return stored
+        item.available = stored.available
+        return item
+
+    def save_availability(self, item: LibraryItem):
+        self.store.set_available(item.isbn, item.available)
+
+    @property
+    def all_items(self) -> List[LibraryItem]:
+        return list(self.iter_items())
+
+    def iter_items(self, **filters) -> Iterator[LibraryItem]:
+        """Iterates over the stored items (see SQLiteStore.iter_items); cached ones are returned as the same objects."""
+        for item in self.store.iter_items(**filters):
+            with self._cache_lock:
+                cached = self._cache.get(item.isbn)
+            yield cached or item
+
+    def cursor(self, item_type: str | None = None, available: bool | None = None,
+               offset: int = 0) -> CatalogCursor:
+        """Pages through the items in ISBN order, filtered and offset by the database."""
+        return CatalogCursor(self.iter_items(item_type=item_type, available=available, offset=offset))
+
+    def get_item_count(self) -> int:
+        return self.store.count_items()
+
+    def find_isbns(self, field: str, value) -> Set[str]:
+        if field not in self._indexes:
+            raise ValueError(f"Field '{field}' is not indexed.")
+        return self.store.find_isbns(field, value)
@@ -2,8 +2,15 @@
 import unittest
 from datetime import date, timedelta
 from pathlib import Path
+import io
 import json
 import csv
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from unittest import mock
 
 # Import all necessary components from your project files
 from library_model import (
@@ -12,10 +19,22 @@ from library_model import (
 )
 # Import PersistenceManager and paths for system testing
 from persistence_manager import PersistenceManager, DATA_DIR, REPORT_FILE
+from binary_state import MappedCatalog
+from sqlite_store import SQLiteStore, SQLiteCatalog
+from lazy_catalog import LazyCatalog
+from main_cli import LibraryCLI, LIST_PAGE_SIZE, STARTUP_TARGET_SECONDS
+from metrics import LatencyHistogram, Metrics
+from workload import SimulatedClock, iter_workload, replay
+from benchmarks import SUITE_VERSION, compare_to_baseline
 
 
 TEST_CSV_PATH = Path(DATA_DIR / "test_import.csv")
 TEST_STATE_PATH = Path(DATA_DIR / "test_state.json")
+TEST_JOURNAL_PATH = Path(DATA_DIR / "test_state.journal")
+TEST_BINARY_PATH = Path(DATA_DIR / "test_state.bin")
+TEST_SQLITE_PATH = Path(DATA_DIR / "test_library.db")
+TEST_DELTA_PATH = Path(DATA_DIR / "test_state.delta")
+TEST_METRICS_PATH = Path(DATA_DIR / "test_metrics.json")
 
 
 def cleanup_test_files():
@@ -25,6 +44,10 @@ def cleanup_test_files():
         REPORT_FILE.unlink()
     if TEST_CSV_PATH.exists():
         TEST_CSV_PATH.unlink()
+    for path in (TEST_JOURNAL_PATH, Path(f"{TEST_JOURNAL_PATH}.old"), TEST_BINARY_PATH, TEST_DELTA_PATH,
+                 TEST_METRICS_PATH, TEST_SQLITE_PATH, Path(f"{TEST_SQLITE_PATH}-wal"), Path(f"{TEST_SQLITE_PATH}-shm")):
+        if path.exists():
+            path.unlink()
         
 class TestLibraryModel(unittest.TestCase):
 
@@ -52,6 +75,89 @@ class TestLibraryModel(unittest.TestCase):
         self.assertIsNone(due_date)
         self.assertIn("already checked out", message)
         
+    def test_items_have_no_instance_dict(self):
+        for item in (self.book, self.dvd, EBook("Test EBook", "333", 2022, "Author Z", 1.5)):
+            self.assertFalse(hasattr(item, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.book.not_a_field = 1
+
+class TestCatalogIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = LibraryCatalog()
+        self.catalog.add_item(Book("Book A", "B1", 2000, "Ann Author", "Fiction"))
+        self.catalog.add_item(Book("Book B", "B2", 2001, "Ann Author", "History"))
+        self.catalog.add_item(DVD("Film C", "D1", 2000, "Dee Director"))
+        self.catalog.add_item(EBook("EBook D", "E1", 2002, "Ann Author", 2.0))
+
+    def test_find_by_indexed_fields(self):
+        self.assertEqual(self.catalog.find_isbns("author", "Ann Author"), {"B1", "B2", "E1"})
+        self.assertEqual(self.catalog.find_isbns("type", "DVD"), {"D1"})
+        self.assertEqual(self.catalog.find_isbns("year", 2000), {"B1", "D1"})
+        self.assertEqual(self.catalog.find_isbns("genre", "Romance"), set())
+        with self.assertRaises(ValueError):
+            self.catalog.find_isbns("title", "Book A")
+
+    def test_remove_item_updates_indexes(self):
+        self.catalog.remove_item("B1")
+        self.assertEqual(self.catalog.find_isbns("author", "Ann Author"), {"B2", "E1"})
+        self.assertEqual(self.catalog.find_isbns("genre", "Fiction"), set())
+        self.assertIsNone(self.catalog.get_item("B1"))
+
+    def test_update_item_moves_index_entries(self):
+        self.catalog.update_item("B2", author="Bo Writer", genre="Fiction")
+        self.assertEqual(self.catalog.find_isbns("author", "Ann Author"), {"B1", "E1"})
+        self.assertEqual(self.catalog.find_isbns("author", "Bo Writer"), {"B2"})
+        self.assertEqual(self.catalog.find_isbns("genre", "Fiction"), {"B1", "B2"})
+        with self.assertRaises(AttributeError):
+            self.catalog.update_item("D1", author="Nobody")
+
+    def test_add_many_conflict_policies(self):
+        report = self.catalog.add_many([Book("New", "B3", 2003, "Cy Writer", "Poetry"),
+                                        Book("Again", "B1", 2003, "Cy Writer", "Poetry"),
+                                        Book("Twice", "B3", 2003, "Cy Writer", "Poetry")], on_conflict="skip")
+        self.assertEqual(report, {"added": 1, "replaced": 0,
+                                  "rejected": [{"isbn": "B1", "reason": "duplicate ISBN"},
+                                               {"isbn": "B3", "reason": "duplicate ISBN"}]})
+        self.assertEqual(self.catalog.get_item("B3").title, "New")
+
+        report = self.catalog.add_many([Book("Book A2", "B1", 2000, "Cy Writer", "Fiction")], on_conflict="replace")
+        self.assertEqual(report["replaced"], 1)
+        self.assertEqual(self.catalog.find_isbns("author", "Ann Author"), {"B2", "E1"})
+        self.assertEqual(self.catalog.find_isbns("author", "Cy Writer"), {"B1", "B3"})
+
+        with self.assertRaisesRegex(ValueError, "already exists"):
+            self.catalog.add_many([DVD("Fresh", "D2", 2005, "X"), DVD("Clash", "D1", 2005, "X")])
+        self.assertIsNone(self.catalog.get_item("D2"))
+
+    def test_add_many_replace_keeps_an_item_on_loan(self):
+        catalog = LibraryCatalog(thread_safe=True)
+        catalog.add_item(Book("Lent", "L1", 2000, "Ann Author", "Fiction"))
+        loan_manager = LoanManager(catalog)
+        loan_manager.checkout_item("Reader", "L1")
+
+        catalog.add_many([Book("Lent, 2nd ed.", "L1", 2001, "Ann Author", "Fiction")], on_conflict="replace")
+        self.assertEqual(catalog.get_item("L1").title, "Lent, 2nd ed.")
+        self.assertFalse(catalog.get_item("L1").available)
+        self.assertIn("already checked out", loan_manager.checkout_item("Other", "L1"))
+        self.assertEqual(loan_manager.loans_for_user("Other"), set())
+        self.assertIn("Reader returned", loan_manager.return_item("L1"))
+        self.assertTrue(catalog.get_item("L1").available)
+
+    def test_cursor_pages_with_filters(self):
+        cursor = self.catalog.cursor()
+        self.assertEqual([item.isbn for item in cursor.next_page(3)], ["B1", "B2", "D1"])
+        self.assertFalse(cursor.exhausted)
+        self.assertEqual([item.isbn for item in cursor.next_page(3)], ["E1"])
+        self.assertTrue(cursor.exhausted)
+        self.assertEqual(cursor.position, 4)
+
+        self.catalog.get_item("B2").available = False
+        self.assertEqual([item.isbn for item in self.catalog.cursor(item_type="Book").next_page()], ["B1", "B2"])
+        self.assertEqual([item.isbn for item in self.catalog.cursor(available=True, offset=1).next_page()], ["D1", "E1"])
+        self.assertEqual([item.isbn for item in self.catalog.cursor(item_type="Book", available=False).next_page()],
+                         ["B2"])
+
 class TestIntegration(unittest.TestCase):
 
 
@@ -108,6 +214,130 @@ class TestIntegration(unittest.TestCase):
         data = self.loan_manager.checkouts_to_dict()
         self.assertEqual(data[self.book_isbn]['due_date'], today.isoformat())
 
+class TestLoanIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = LibraryCatalog()
+        self.loan_manager = LoanManager(self.catalog)
+        self.catalog.add_item(Book("Loan Book", "B1", 2020, "Author", "Fiction"))  # 14 days
+        self.catalog.add_item(DVD("Loan DVD", "D1", 2021, "Director"))  # 3 days
+        self.catalog.add_item(EBook("Loan EBook", "E1", 2022, "Author", 1.0))  # 28 days
+        for isbn in ("B1", "D1", "E1"):
+            self.loan_manager.checkout_item("UserA", isbn)
+
+    def test_overdue_and_due_between(self):
+        today = date.today()
+        self.assertEqual(self.loan_manager.overdue(), [])
+        self.assertEqual(self.loan_manager.overdue(today + timedelta(days=15)), ["D1", "B1"])
+        self.assertEqual(self.loan_manager.due_between(today, today + timedelta(days=3)), ["D1"])
+        self.assertEqual(self.loan_manager.due_between(today + timedelta(days=3), today + timedelta(days=28)),
+                         ["D1", "B1", "E1"])
+
+    def test_return_and_load_keep_due_dates_in_sync(self):
+        later = date.today() + timedelta(days=30)
+        self.loan_manager.return_item("D1")
+        self.assertEqual(self.loan_manager.overdue(later), ["B1", "E1"])
+
+        self.loan_manager.load_checkouts_from_dict({"X1": {"user": "UserB", "due_date": "2000-01-01"}})
+        self.assertEqual(self.loan_manager.overdue(later), ["X1"])
+        self.assertEqual(self.loan_manager.due_between(date(2000, 1, 1), date(2000, 1, 1)), ["X1"])
+
+    def test_loans_by_user(self):
+        self.loan_manager.return_item("D1")
+        self.assertEqual(self.loan_manager.loans_for_user("UserA"), {"B1", "E1"})
+        self.assertEqual(self.loan_manager.count_for_user("UserA"), 2)
+        self.assertEqual(self.loan_manager.loans_for_user("Nobody"), set())
+
+        self.loan_manager.load_checkouts_from_dict({"X1": {"user": "UserB", "due_date": "2000-01-01"}})
+        self.assertEqual(self.loan_manager.count_for_user("UserA"), 0)
+        self.assertEqual(self.loan_manager.loans_for_user("UserB"), {"X1"})
+
+    def test_checkout_many_and_return_many(self):
+        self.catalog.add_item(Book("Batch Book", "B2", 2020, "Author", "Fiction"))
+        results = self.loan_manager.checkout_many([("UserB", "B2"), ("UserB", "B1"), ("UserB", "0000")])
+        self.assertEqual([r["status"] for r in results], ["checked_out", "unavailable", "not_found"])
+        self.assertEqual(results[0]["due_date"], date.today() + timedelta(days=14))
+        self.assertEqual(self.loan_manager.loans_for_user("UserB"), {"B2"})
+
+        self.catalog.add_item(DVD("Lost DVD", "D2", 2021, "Director", available=False))
+        results = self.loan_manager.return_many([("B1", 5), ("D2", 3), ("B2", 0), ("0000", 0)])
+        self.assertEqual([r["status"] for r in results], ["returned", "corrected", "returned", "not_found"])
+        self.assertEqual([r["fee"] for r in results], [2.5, 0.0, 0.0, 0.0])
+        self.assertEqual(results[0]["user"], "UserA")
+        self.assertTrue(self.catalog.get_item("D2").available)
+        self.assertEqual(self.loan_manager.loans_for_user("UserB"), set())
+
+class TestThreadSafety(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = LibraryCatalog(thread_safe=True)
+        self.loan_manager = LoanManager(self.catalog)
+        self.isbns = [f"T{i}" for i in range(200)]
+        for isbn in self.isbns:
+            self.catalog.add_item(Book("Thread Book", isbn, 2020, "Author", "Fiction"))
+        # Switch threads as often as possible to shake out races.
+        self._interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self._interval)
+
+    def _run_threads(self, target, count=8):
+        barrier = threading.Barrier(count)
+        def run(n):
+            barrier.wait()
+            target(n)
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_checkouts_never_double_book(self):
+        wins = []
+        def checkout_all(n):
+            for isbn in self.isbns:
+                if "User:" in self.loan_manager.checkout_item(f"User{n}", isbn):
+                    wins.append(isbn)
+        self._run_threads(checkout_all)
+
+        self.assertEqual(sorted(wins), sorted(self.isbns))
+        self.assertEqual(sum(self.loan_manager.count_for_user(f"User{n}") for n in range(8)), 200)
+
+    def test_mixed_checkouts_and_returns_stay_consistent(self):
+        def churn(n):
+            for _ in range(5):
+                self.loan_manager.checkout_many((f"User{n}", isbn) for isbn in self.isbns)
+                self.loan_manager.return_many((isbn, 0) for isbn in self.isbns[n::8])
+        self._run_threads(churn)
+
+        checked_out = {item.isbn for item in self.catalog.iter_items() if not item.available}
+        self.assertEqual(set(self.loan_manager.get_current_checkouts()), checked_out)
+        self.assertEqual(sum(self.loan_manager.count_for_user(f"User{n}") for n in range(8)), len(checked_out))
+        self.assertEqual(len(self.loan_manager.overdue(date.today() + timedelta(days=30))), len(checked_out))
+
+    def test_loans_stay_consistent_while_items_are_replaced(self):
+        # Thread 0 keeps replacing every item while two desks try to check each one out twice.
+        wins, desks_done = [], []
+        def replace_or_lend(n):
+            if n == 0:
+                while len(desks_done) < 2:
+                    self.catalog.add_many((Book("Replaced", isbn, 2021, "Author", "Fiction") for isbn in self.isbns),
+                                          on_conflict="replace")
+                return
+            for isbn in self.isbns:
+                if "User:" in self.loan_manager.checkout_item(f"User{n}", isbn):
+                    wins.append(isbn)
+                wins.extend(result["isbn"] for result in self.loan_manager.checkout_many([(f"User{n}", isbn)])
+                            if result["status"] == "checked_out")
+            desks_done.append(n)
+        self._run_threads(replace_or_lend, count=3)
+
+        self.assertEqual(sorted(wins), sorted(self.isbns))
+        self.assertEqual(set(self.loan_manager.get_current_checkouts()), set(self.isbns))
+        self.assertFalse(any(item.available for item in self.catalog.iter_items()))
+
+
 class TestPersistence(unittest.TestCase):
 
     
@@ -168,6 +398,26 @@ class TestPersistence(unittest.TestCase):
         self.assertIsInstance(self.catalog.get_item("I222"), DVD)
 
 
+    def test_parallel_import_matches_serial_import(self):
+        with open(TEST_CSV_PATH, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["type", "title", "isbn", "year", "author", "genre", "director", "file_size"])
+            for i in range(200):
+                writer.writerow(["Book", f"Parallel {i}", f"P{i}", "2023", "Author", "Test", "", ""])
+            writer.writerow(["Book", "Duplicate", "P7", "2023", "Author", "Test", "", ""])
+            writer.writerow(["EBook", "Bad Size", "P999", "2023", "Author", "", "", "big"])
+            writer.writerow(["DVD", "Last", "P-last", "2024", "", "", "Director", ""])
+
+        imported_count, message = self.persistence.import_items_from_csv(str(TEST_CSV_PATH), workers=3)
+        self.assertEqual(imported_count, 201)
+        self.assertEqual(self.catalog.get_item("P7").title, "Parallel 7")
+        self.assertIsNone(self.catalog.get_item("P999"))
+        self.assertIsInstance(self.catalog.get_item("P-last"), DVD)
+
+        serial_catalog = LibraryCatalog()
+        serial = PersistenceManager(serial_catalog, LoanManager(serial_catalog))
+        self.assertEqual(serial.import_items_from_csv(str(TEST_CSV_PATH))[0], imported_count)
+
     # 3. Reporting Workflow (Export)
     def test_export_loan_report_workflow(self):
         self.loan_manager.checkout_item("ReportUser", self.dvd_isbn)
@@ -180,7 +430,448 @@ class TestPersistence(unittest.TestCase):
         self.assertIn("Current Loan Report", content)
         self.assertIn(self.dvd_isbn, content)
 
-    # 4. Robustness Test: Load Corrupted State (Required Error Handling)
+    def test_export_loan_report_formats(self):
+        self.loan_manager.return_item(self.book_isbn)  # setUp lent it to SysUser
+        self.loan_manager.checkout_item("BookUser", self.book_isbn)  # 14 days
+        self.loan_manager.checkout_item("DvdUser", self.dvd_isbn)  # 3 days
+        csv_path = DATA_DIR / "test_report.csv"
+        jsonl_path = DATA_DIR / "test_report.jsonl"
+        try:
+            self.persistence.export_loan_report("csv", sort_by_due_date=True, path=csv_path)
+            with open(csv_path, newline='', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+            self.assertEqual([row["isbn"] for row in rows], [self.dvd_isbn, self.book_isbn])
+            self.assertEqual([row["user"] for row in rows], ["DvdUser", "BookUser"])
+
+            self.persistence.export_loan_report("jsonl", path=jsonl_path)
+            with open(jsonl_path, encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual({record["isbn"]: record["user"] for record in records},
+                             {self.book_isbn: "BookUser", self.dvd_isbn: "DvdUser"})
+        finally:
+            csv_path.unlink(missing_ok=True)
+            jsonl_path.unlink(missing_ok=True)
+        self.assertIn("Unknown report format", self.persistence.export_loan_report("xml"))
+
+    # 4. Background Autosave
+    def test_autosave_coalesces_changes(self):
+        with self.assertRaises(ValueError):
+            self.persistence.start_autosave()
+
+        catalog = LibraryCatalog(thread_safe=True)
+        loan_manager = LoanManager(catalog)
+        persistence = PersistenceManager(catalog, loan_manager)
+        persistence.STATE_FILE = TEST_STATE_PATH
+        worker = persistence.start_autosave(delay=60)
+        try:
+            for i in range(50):
+                catalog.add_item(Book(f"Auto Book {i}", f"A{i}", 2020, "Author", "Fiction"))
+                loan_manager.checkout_item("AutoUser", f"A{i}")
+            self.assertEqual(worker.save_count, 0)
+            self.assertIn("successfully saved", worker.flush())
+            self.assertEqual(worker.save_count, 1)
+        finally:
+            worker.close()
+
+        new_catalog = LibraryCatalog()
+        new_loan_manager = LoanManager(new_catalog)
+        new_persistence = PersistenceManager(new_catalog, new_loan_manager)
+        new_persistence.STATE_FILE = TEST_STATE_PATH
+        new_persistence.load_state()
+        self.assertEqual(new_catalog.get_item_count(), 50)
+        self.assertEqual(new_loan_manager.count_for_user("AutoUser"), 50)
+
+    def test_concurrent_saves_never_write_an_older_snapshot(self):
+        write_state_file = self.persistence._write_state_file
+        first_write = threading.Event()
+
+        def slow_first_write(*args, **kwargs):
+            # The first save stalls between its snapshot and its write.
+            if not first_write.is_set():
+                first_write.set()
+                time.sleep(0.2)
+            return write_state_file(*args, **kwargs)
+
+        with mock.patch.object(self.persistence, "_write_state_file", side_effect=slow_first_write):
+            older = threading.Thread(target=self.persistence.save_state)
+            older.start()
+            first_write.wait(5)
+            self.loan_manager.checkout_item("LaterUser", self.dvd_isbn)
+            self.persistence.save_state()
+            older.join()
+
+        with open(TEST_STATE_PATH, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)["checkouts"][self.dvd_isbn]["user"], "LaterUser")
+
+    # 5. Journal Mode: changes are appended and replayed over the snapshot
+    def _journaled_system(self, **options):
+        catalog = LibraryCatalog(thread_safe="compact_after" in options)
+        loan_manager = LoanManager(catalog)
+        persistence = PersistenceManager(catalog, loan_manager, journal=True, **options)
+        persistence.STATE_FILE = TEST_STATE_PATH
+        persistence.JOURNAL_FILE = TEST_JOURNAL_PATH
+        return catalog, loan_manager, persistence
+
+    def test_journal_replays_changes(self):
+        catalog, loan_manager, persistence = self._journaled_system()
+        catalog.add_item(Book("Journal Book", "J1", 2020, "Author", "Fiction"))
+        catalog.add_item(DVD("Journal DVD", "J2", 2021, "Director"))
+        persistence.checkpoint()
+        loan_manager.checkout_item("UserJ", "J1")
+        loan_manager.checkout_item("UserJ", "J2")
+        loan_manager.return_item("J2")
+        catalog.add_item(EBook("Journal EBook", "J3", 2022, "Author", 1.0))
+        self.assertIn("saved", persistence.save_state())
+        persistence.close()
+
+        with open(TEST_JOURNAL_PATH, 'r', encoding='utf-8') as f:
+            self.assertEqual([json.loads(line)["op"] for line in f], ["checkout", "checkout", "return", "add"])
+
+        new_catalog, new_loan_manager, new_persistence = self._journaled_system()
+        result = new_persistence.load_state()
+        self.assertIn("Replayed 4 journal records", result)
+        self.assertEqual(new_catalog.get_item_count(), 3)
+        self.assertEqual(new_loan_manager.loans_for_user("UserJ"), {"J1"})
+        self.assertFalse(new_catalog.get_item("J1").available)
+        self.assertTrue(new_catalog.get_item("J2").available)
+        self.assertEqual(new_loan_manager.get_current_checkouts()["J1"]["due_date"], date.today() + timedelta(days=14))
+        new_persistence.close()
+
+    def test_journal_ignores_torn_final_record(self):
+        catalog, loan_manager, persistence = self._journaled_system()
+        catalog.add_item(Book("Journal Book", "J1", 2020, "Author", "Fiction"))
+        persistence.close()
+        with open(TEST_JOURNAL_PATH, 'a', encoding='utf-8') as f:
+            f.write('{"op":"checkout","isbn":"J1","us')
+
+        new_catalog, new_loan_manager, new_persistence = self._journaled_system()
+        self.assertIn("Replayed 1 journal records", new_persistence.load_state())
+        self.assertTrue(new_catalog.get_item("J1").available)
+        self.assertIn("incomplete record", new_persistence.load_errors[0])
+
+        # The next session appends after the torn record rather than onto it.
+        new_catalog.add_item(Book("Journal Book 2", "J2", 2020, "Author", "Fiction"))
+        new_catalog.add_item(Book("Journal Book 3", "J3", 2020, "Author", "Fiction"))
+        new_persistence.close()
+        catalog, loan_manager, persistence = self._journaled_system()
+        self.assertIn("Replayed 3 journal records", persistence.load_state())
+        self.assertEqual(sorted(item.isbn for item in catalog.all_items), ["J1", "J2", "J3"])
+        self.assertEqual(persistence.load_errors, [])
+        persistence.close()
+
+    def test_journal_skips_damaged_record_in_the_middle(self):
+        catalog, loan_manager, persistence = self._journaled_system()
+        catalog.add_item(Book("Journal Book", "J1", 2020, "Author", "Fiction"))
+        persistence.close()
+        with open(TEST_JOURNAL_PATH, 'a', encoding='utf-8') as f:
+            f.write('{"op":"chec\n')
+        catalog, loan_manager, persistence = self._journaled_system()
+        persistence.load_state()
+        catalog.add_item(Book("Journal Book 2", "J2", 2020, "Author", "Fiction"))
+        persistence.close()
+
+        new_catalog, new_loan_manager, new_persistence = self._journaled_system()
+        self.assertIn("Replayed 2 journal records", new_persistence.load_state())
+        self.assertEqual(new_catalog.get_item_count(), 2)
+        self.assertIn("line 2", new_persistence.load_errors[0])
+
+    def test_background_compaction_keeps_every_change(self):
+        catalog, loan_manager, persistence = self._journaled_system(compact_after=20)
+        for i in range(100):
+            catalog.add_item(Book(f"Compact Book {i}", f"C{i}", 2020, "Author", "Fiction"))
+            loan_manager.checkout_item("UserC", f"C{i}")
+        persistence.close()
+        self.assertIsNotNone(persistence.last_checkpoint)
+        self.assertFalse(Path(f"{TEST_JOURNAL_PATH}.old").exists())
+
+        new_catalog, new_loan_manager, new_persistence = self._journaled_system()
+        new_persistence.load_state()
+        self.assertEqual(new_catalog.get_item_count(), 100)
+        self.assertEqual(new_loan_manager.count_for_user("UserC"), 100)
+
+    # 6. Robustness Test: A failed save keeps the previous state file
+    def test_failed_save_keeps_previous_state(self):
+        self.persistence.save_state()
+        self.catalog.update_item(self.dvd_isbn, director=object())  # not JSON serializable
+
+        self.assertIn("ERROR", self.persistence.save_state())
+        self.assertEqual(list(DATA_DIR.glob("test_state.json.tmp")), [])
+        with open(TEST_STATE_PATH, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)["catalog_items"]), 2)
+
+    # 7. Streaming Load: legacy layout, skipped records are collected instead of printed
+    def test_streaming_load_collects_skipped_records(self):
+        with open(TEST_STATE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({
+                "checkouts": {"S1": {"user": "StreamUser", "due_date": "2030-01-01"}},
+                "catalog_items": [
+                    Book("Stream Book", "S1", 2020, "Author", "Fiction", available=False).to_dict(),
+                    {"type": "Scroll", "title": "Unknown Type", "isbn": "S2"},
+                    {"type": "DVD", "title": "Missing Fields", "isbn": "S3"},
+                    {"type": "Book", "title": "", "isbn": "S4", "year": 2020, "author": "A", "genre": "G",
+                     "available": True},
+                ],
+            }, f, indent=4)
+
+        result = self.persistence.load_state()
+        self.assertIn("Restored 1 items", result)
+        self.assertIn("Skipped 3 records", result)
+        self.assertEqual(len(self.persistence.load_errors), 3)
+        self.assertEqual(self.loan_manager.loans_for_user("StreamUser"), {"S1"})
+
+        # A lazy load skips the same records, though it builds none of them.
+        catalog = LazyCatalog()
+        loan_manager = LoanManager(catalog)
+        persistence = PersistenceManager(catalog, loan_manager)
+        persistence.STATE_FILE = TEST_STATE_PATH
+        result = persistence.load_state()
+        self.assertIn("Restored 1 items", result)
+        self.assertEqual(len(persistence.load_errors), 3)
+        self.assertIn("missing year, available, director", persistence.load_errors[1])
+        self.assertEqual(catalog.unbuilt_count, 1)
+        self.assertIsNone(catalog.get_item("S3"))
+        self.assertEqual([item.isbn for item in catalog.iter_items()], ["S1"])
+
+    def test_lazy_load_builds_items_on_demand(self):
+        self.catalog.add_item(EBook("Persist EBook", "7000", 2022, "E. Author", 1.5))
+        self.persistence.save_state()
+        with open(TEST_STATE_PATH, encoding='utf-8') as f:
+            saved_lines = f.read().splitlines()
+
+        catalog = LazyCatalog()
+        loan_manager = LoanManager(catalog)
+        persistence = PersistenceManager(catalog, loan_manager)
+        persistence.STATE_FILE = TEST_STATE_PATH
+        self.assertIn("Restored 3 items", persistence.load_state())
+        self.assertEqual(catalog.get_item_count(), 3)
+        self.assertEqual(catalog.unbuilt_count, 3)
+
+        self.assertIsInstance(catalog.get_item(self.dvd_isbn), DVD)
+        self.assertEqual(catalog.unbuilt_count, 2)
+        loan_manager.checkout_item("LazyUser", self.dvd_isbn)
+        with self.assertRaises(ValueError):
+            catalog.add_item(Book("Clash", "7000", 2020, "A", "B"))
+
+        persistence.save_state()
+        with open(TEST_STATE_PATH, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        # Records that were never built are written back unchanged.
+        saved_records = [line.strip().rstrip(",") for line in saved_lines if '"type"' in line]
+        records = [line.strip().rstrip(",") for line in lines if '"type"' in line]
+        untouched = [record for record in saved_records if f'"isbn": "{self.dvd_isbn}"' not in record]
+        self.assertEqual(len(untouched), 2)
+        self.assertTrue(all(record in records for record in untouched))
+        self.assertEqual(catalog.unbuilt_count, 2)
+
+        # A listing page builds only the items on it.
+        self.assertEqual(len(catalog.cursor().next_page(2)), 2)
+        self.assertEqual(catalog.unbuilt_count, 1)
+
+        self.assertEqual(catalog.find_isbns("type", "Book"), {self.book_isbn})
+        self.assertEqual(catalog.unbuilt_count, 0)
+        self.assertFalse(catalog.get_item(self.dvd_isbn).available)
+
+    def test_lazy_replace_and_update_do_not_deadlock(self):
+        catalog = LazyCatalog(thread_safe=True)
+        catalog.add_raw_records((f"LZ{i}", json.dumps(Book("Raw", f"LZ{i}", 2020, "A", "B").to_dict()))
+                                for i in range(50))
+        def replace():
+            for _ in range(50):
+                catalog.add_many((Book("Replaced", f"LZ{i}", 2021, "A", "B") for i in range(50)), on_conflict="replace")
+        def update():
+            for _ in range(50):
+                for i in range(50):
+                    catalog.update_item(f"LZ{i}", title="Updated")
+        threads = [threading.Thread(target=replace, daemon=True), threading.Thread(target=update, daemon=True)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.assertEqual(catalog.get_item_count(), 50)
+
+    # 8. Delta Saves: only the records changed since the last full snapshot are written
+    def _delta_system(self):
+        catalog = LibraryCatalog()
+        loan_manager = LoanManager(catalog)
+        persistence = PersistenceManager(catalog, loan_manager, delta_saves=True, delta_limit=0.5)
+        persistence.STATE_FILE = TEST_STATE_PATH
+        persistence.DELTA_FILE = TEST_DELTA_PATH
+        return catalog, loan_manager, persistence
+
+    def test_delta_saves_write_only_changes(self):
+        catalog, loan_manager, persistence = self._delta_system()
+        for i in range(10):
+            catalog.add_item(Book(f"Delta {i}", f"DL{i}", 2020, "Author", "Fiction"))
+        persistence.save_state()
+        self.assertEqual(persistence.last_save["mode"], "full")
+
+        loan_manager.checkout_item("DeltaUser", "DL1")
+        catalog.update_item("DL2", title="Delta 2 revised")
+        persistence.save_state()
+        self.assertEqual(persistence.last_save["mode"], "delta")
+        self.assertEqual(persistence.last_save["records"], 3)  # DL1 and DL2, plus DL1's loan
+        catalog.remove_item("DL3")
+        persistence.save_state()
+        self.assertEqual(persistence.last_save["records"], 4)  # deltas accumulate until the next full save
+
+        catalog, loan_manager, persistence = self._delta_system()
+        self.assertIn("Applied 4 delta records", persistence.load_state())
+        self.assertEqual(catalog.get_item_count(), 9)
+        self.assertFalse(catalog.get_item("DL1").available)
+        self.assertEqual(catalog.get_item("DL2").title, "Delta 2 revised")
+        self.assertEqual(loan_manager.loans_for_user("DeltaUser"), {"DL1"})
+
+        # Changing more than delta_limit of the catalog writes a new full snapshot; the old delta is dropped.
+        for i in range(4, 9):
+            catalog.update_item(f"DL{i}", title="Bulk")
+        persistence.save_state()
+        self.assertEqual(persistence.last_save["mode"], "full")
+        self.assertFalse(TEST_DELTA_PATH.exists())
+
+    # 9. Binary State: a read-only catalog mapped from the binary file
+    def test_binary_state_mapped_catalog(self):
+        self.catalog.add_item(EBook("Persist EBook", "7000", 2022, "P. Author", 2.5))
+        self.persistence.BINARY_STATE_FILE = TEST_BINARY_PATH
+        self.assertIn("successfully saved", self.persistence.save_binary_state())
+
+        with MappedCatalog(TEST_BINARY_PATH) as mapped:
+            self.assertEqual(mapped.get_item_count(), 3)
+            book = mapped.get_item(self.book_isbn)
+            self.assertIsInstance(book, Book)
+            self.assertEqual((book.title, book.author, book.genre, book.year, book.available),
+                             ("Persist Book", "P. Author", "SciFi", 2020, False))
+            self.assertEqual(mapped.get_item("7000").file_size, 2.5)
+            self.assertIsNone(mapped.get_item("1234"))
+            self.assertEqual([item.isbn for item in mapped.iter_items()], ["7000", "8000", "9000"])
+            self.assertEqual(mapped.find_isbns("author", "P. Author"), {"7000", "9000"})
+            self.assertEqual(mapped.find_isbns("type", "DVD"), {self.dvd_isbn})
+            with self.assertRaises(TypeError):
+                mapped.add_item(Book("New", "1", 2020, "A", "B"))
+
+            loan_manager = LoanManager(mapped)
+            loan_manager.load_checkouts_from_dict(mapped.checkouts())
+            self.assertEqual(loan_manager.loans_for_user("SysUser"), {self.book_isbn})
+            with self.assertRaises(TypeError):
+                mapped.add_many([Book("New", "1", 2020, "A", "B")])
+            # Lookup only: each get_item is a fresh copy, so lending through it is refused.
+            self.assertIn("read-only", loan_manager.checkout_item("OtherUser", self.book_isbn))
+            self.assertIn("read-only", loan_manager.return_item(self.book_isbn))
+            self.assertEqual(loan_manager.checkout_many([("OtherUser", "7000")])[0]["status"], "read_only")
+            self.assertEqual(loan_manager.return_many([(self.book_isbn, 0)])[0]["status"], "read_only")
+            self.assertEqual(loan_manager.loans_for_user("OtherUser"), set())
+            self.assertEqual(loan_manager.loans_for_user("SysUser"), {self.book_isbn})
+
+    # 10. SQLite Backend: items and loans are written through to the database
+    def _sqlite_system(self):
+        store = SQLiteStore(TEST_SQLITE_PATH)
+        catalog = SQLiteCatalog(store, cache_size=2)
+        loan_manager = LoanManager(catalog)
+        persistence = PersistenceManager(catalog, loan_manager, store=store)
+        return store, catalog, loan_manager, persistence
+
+    def test_sqlite_backend_writes_through(self):
+        store, catalog, loan_manager, persistence = self._sqlite_system()
+        catalog.add_item(Book("SQL Book", "Q1", 2020, "Ann Author", "Fiction"))
+        catalog.add_item(DVD("SQL DVD", "Q2", 2021, "Dee Director"))
+        catalog.add_item(EBook("SQL EBook", "Q3", 2022, "Ann Author", 3.5))
+        with self.assertRaisesRegex(ValueError, "already exists"):
+            catalog.add_item(Book("Duplicate", "Q1", 2020, "A", "B"))
+        catalog.update_item("Q3", title="SQL EBook 2")
+        loan_manager.checkout_item("SqlUser", "Q1")
+        loan_manager.checkout_item("SqlUser", "Q2")
+        loan_manager.return_item("Q2")
+        self.assertEqual(catalog.find_isbns("author", "Ann Author"), {"Q1", "Q3"})
+        store.close()
+
+        store, catalog, loan_manager, persistence = self._sqlite_system()
+        self.assertIn("Restored 3 items", persistence.load_state())
+        self.assertFalse(catalog.get_item("Q1").available)
+        self.assertTrue(catalog.get_item("Q2").available)
+        self.assertEqual(catalog.get_item("Q3").title, "SQL EBook 2")
+        self.assertEqual(loan_manager.loans_for_user("SqlUser"), {"Q1"})
+        self.assertEqual(sorted(item.isbn for item in catalog.iter_items()), ["Q1", "Q2", "Q3"])
+        self.assertEqual([item.isbn for item in catalog.cursor(available=True).next_page()], ["Q2", "Q3"])
+        self.assertEqual([item.isbn for item in catalog.cursor(item_type="DVD").next_page()], ["Q2"])
+        self.assertEqual([item.isbn for item in catalog.cursor(offset=2).next_page()], ["Q3"])
+        catalog.remove_item("Q2")
+        self.assertIsNone(catalog.get_item("Q2"))
+        store.close()
+
+    def test_sqlite_concurrent_checkouts_with_a_small_cache_never_double_book(self):
+        store = SQLiteStore(TEST_SQLITE_PATH)
+        catalog = SQLiteCatalog(store, cache_size=1, thread_safe=True)
+        isbns = [f"C{i}" for i in range(50)]
+        catalog.add_many(Book("Cached Book", isbn, 2020, "Author", "Fiction") for isbn in isbns)
+        loan_manager = LoanManager(catalog)
+        wins = []
+        barrier = threading.Barrier(8)
+        def checkout_all(n):
+            barrier.wait()
+            for isbn in isbns:
+                if "User:" in loan_manager.checkout_item(f"User{n}", isbn):
+                    wins.append(isbn)
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=checkout_all, args=(n,)) for n in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        self.assertEqual(sorted(wins), sorted(isbns))
+        self.assertEqual(len(loan_manager.get_current_checkouts()), len(isbns))
+        self.assertFalse(any(item.available for item in store.iter_items()))
+        store.close()
+
+    def test_sqlite_iter_items_returns_connection_between_batches(self):
+        store = SQLiteStore(TEST_SQLITE_PATH, pool_size=1)
+        catalog = SQLiteCatalog(store)
+        for i in range(7):
+            catalog.add_item(Book(f"Paged {i}", f"P{i}", 2020, "Author", "Fiction"))
+        catalog.update_item("P3", available=False)
+        self.assertEqual([item.isbn for item in store.iter_items(batch_size=2)], [f"P{i}" for i in range(7)])
+        self.assertEqual([item.isbn for item in store.iter_items(batch_size=2, available=True, offset=1)],
+                         ["P1", "P2", "P4", "P5", "P6"])
+
+        # An abandoned generator must not keep the only pooled connection.
+        abandoned = store.iter_items(batch_size=2)
+        next(abandoned)
+        lookup = threading.Thread(target=store.get_item, args=("P5",), daemon=True)
+        lookup.start()
+        lookup.join(timeout=5)
+        self.assertFalse(lookup.is_alive())
+        abandoned.close()
+        store.close()
+
+    def test_sqlite_import_is_one_transaction(self):
+        with open(TEST_CSV_PATH, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["type", "title", "isbn", "year", "author", "genre", "director", "file_size"])
+            writer.writerow(["Book", "Import 1", "I1", "2023", "A", "Test", "", ""])
+            writer.writerow(["Book", "Import 1 again", "I1", "2023", "A", "Test", "", ""])
+            writer.writerow(["DVD", "Import 2", "I2", "2024", "", "", "B", ""])
+
+        store, catalog, loan_manager, persistence = self._sqlite_system()
+        imported_count, message = persistence.import_items_from_csv(str(TEST_CSV_PATH))
+        self.assertEqual(imported_count, 2)
+        self.assertEqual(catalog.get_item_count(), 2)
+        self.assertEqual(persistence.import_errors, ["WARNING: Skipping row I1: duplicate ISBN"])
+
+        loan_manager.checkout_item("SqlUser", "I2")
+        imported_count, message = persistence.import_items_from_csv(str(TEST_CSV_PATH), on_conflict="replace")
+        self.assertEqual(imported_count, 3)
+        self.assertEqual(catalog.get_item("I1").title, "Import 1 again")
+        self.assertEqual(store.get_item("I1").title, "Import 1 again")
+        self.assertFalse(catalog.get_item("I2").available)
+        self.assertFalse(store.get_item("I2").available)
+        self.assertIn("already checked out", loan_manager.checkout_item("Other", "I2"))
+        store.close()
+
+    # 11. Robustness Test: Load Corrupted State (Required Error Handling)
     def test_load_corrupted_state(self):
         with open(TEST_STATE_PATH, 'w') as f:
             f.write("{This is invalid JSON") 
@@ -192,6 +883,245 @@ class TestPersistence(unittest.TestCase):
         self.assertEqual(len(self.loan_manager.get_current_checkouts()), 0)
 
 
+class TestInstantStart(unittest.TestCase):
+
+    ITEMS = 30_000
+
+    def setUp(self):
+        cleanup_test_files()
+        catalog = LibraryCatalog()
+        catalog.add_many(Book(f"Title {i}", f"IS{i}", 2000, "Author", "Fiction") for i in range(self.ITEMS))
+        loan_manager = LoanManager(catalog)
+        loan_manager.checkout_item("EarlyUser", "IS0")
+        loan_manager.checkout_item("LateUser", f"IS{self.ITEMS - 1}")
+        persistence = PersistenceManager(catalog, loan_manager)
+        persistence.STATE_FILE = TEST_STATE_PATH
+        persistence.save_state()
+
+    def tearDown(self):
+        cleanup_test_files()
+
+    def test_menu_is_ready_within_startup_target(self):
+        with mock.patch.object(PersistenceManager, "STATE_FILE", TEST_STATE_PATH):
+            start = time.perf_counter()
+            cli = LibraryCLI(instant=True)
+            startup_seconds = time.perf_counter() - start
+            self.assertLess(startup_seconds, STARTUP_TARGET_SECONDS)
+
+            # An item near the start of the file, and its loan, are usable before the rest has loaded.
+            self.assertTrue(cli.loader.wait("IS1", timeout=30))
+            self.assertIsNotNone(cli.catalog.get_item("IS1"))
+            self.assertEqual(cli.loan_manager.loans_for_user("EarlyUser"), {"IS0"})
+            cli.loan_manager.checkout_item("ClerkUser", "IS1")
+
+            self.assertTrue(cli.loader.wait(timeout=30))
+        self.assertEqual(cli.catalog.get_item_count(), self.ITEMS)
+        self.assertEqual(cli.loan_manager.loans_for_user("ClerkUser"), {"IS1"})
+
+    def test_return_waits_for_its_item_to_load(self):
+        with mock.patch.object(PersistenceManager, "STATE_FILE", TEST_STATE_PATH):
+            cli = LibraryCLI(instant=True)
+            output = io.StringIO()
+            with mock.patch("builtins.input", side_effect=[f"IS{self.ITEMS - 1}", "0"]), redirect_stdout(output):
+                cli.handle_return()
+            self.assertTrue(cli.loader.wait(timeout=30))
+        self.assertIn("LateUser returned", output.getvalue())
+        self.assertTrue(cli.catalog.get_item(f"IS{self.ITEMS - 1}").available)
+        self.assertEqual(cli.loan_manager.loans_for_user("LateUser"), set())
+
+    def test_list_items_shows_one_page_at_a_time(self):
+        with mock.patch.object(PersistenceManager, "STATE_FILE", TEST_STATE_PATH):
+            cli = LibraryCLI()
+        output = io.StringIO()
+        with mock.patch("builtins.input", side_effect=["Book", "l"]), redirect_stdout(output):
+            cli.list_items()
+        self.assertIn("- ", output.getvalue())
+        self.assertIn("EarlyUser", output.getvalue())
+
+        output = io.StringIO()
+        with mock.patch("builtins.input", side_effect=["", "a", "q"]), redirect_stdout(output):
+            cli.list_items()
+        item_lines = [line for line in output.getvalue().splitlines() if line.startswith("- ")]
+        self.assertEqual(len(item_lines), LIST_PAGE_SIZE)
+        self.assertNotIn("Current Loans", output.getvalue())
+
+
+
+class TestBatchMode(unittest.TestCase):
+
+    def setUp(self):
+        cleanup_test_files()
+
+    def tearDown(self):
+        cleanup_test_files()
+
+    def test_batch_runs_commands_and_saves_once(self):
+        script = io.StringIO(
+            "# nightly job\n"
+            "checkout BD1 Night Clerk\n"
+            "checkout BE1 Night Clerk\n"
+            "checkout BD1 Someone Else\n"
+            "return BE1 2\n"
+            "return NOPE\n"
+            "renew BD1\n"
+            "\n"
+        )
+        results = io.StringIO()
+        with mock.patch.object(PersistenceManager, "STATE_FILE", TEST_STATE_PATH):
+            cli = LibraryCLI(seed_demo=False)
+            self.assertEqual(cli.catalog.get_item_count(), 0)
+            cli.catalog.add_item(DVD("Batch DVD", "BD1", 2020, "Director"))
+            cli.catalog.add_item(EBook("Batch EBook", "BE1", 2021, "Author", 1.5))
+            with mock.patch.object(PersistenceManager, "save_state", wraps=cli.persistence.save_state) as save:
+                summary = cli.run_batch(script, results)
+            self.assertEqual(save.call_count, 1)
+
+        lines = [json.loads(line) for line in results.getvalue().splitlines()]
+        self.assertEqual([(line["line"], line["status"]) for line in lines[:-1]],
+                         [(4, "unavailable"), (6, "not_found"), (7, "invalid")])
+        self.assertEqual(lines[-1]["summary"]["ok"], 3)
+        self.assertEqual(summary["failed"], 3)
+        with open(TEST_STATE_PATH, encoding='utf-8') as f:
+            state = json.load(f)
+        self.assertEqual(state["checkouts"]["BD1"]["user"], "Night Clerk")
+        self.assertEqual(sorted(item["isbn"] for item in state["catalog_items"]), ["BD1", "BE1"])
+
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        cleanup_test_files()
+        self.metrics = Metrics()
+        self.catalog = LibraryCatalog()
+        self.loan_manager = LoanManager(self.catalog, metrics=self.metrics)
+        self.persistence = PersistenceManager(self.catalog, self.loan_manager, metrics=self.metrics)
+        self.persistence.STATE_FILE = TEST_STATE_PATH
+
+    def tearDown(self):
+        cleanup_test_files()
+
+    def test_percentiles_are_within_one_bucket(self):
+        histogram = LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        self.assertEqual(histogram.count, 1000)
+        for fraction, exact in ((0.50, 0.500), (0.95, 0.950), (0.99, 0.990)):
+            self.assertGreaterEqual(histogram.percentile(fraction), exact)
+            self.assertLessEqual(histogram.percentile(fraction), exact * 1.25)
+        self.assertEqual(histogram.percentile(1.0), 1.0)
+
+    def test_operations_and_persistence_are_counted(self):
+        self.catalog.add_item(Book("Metric Book", "M1", 2020, "Author", "Fiction"))
+        self.loan_manager.checkout_item("MetricUser", "M1")
+        self.loan_manager.checkout_item("MetricUser", "M1")
+        self.loan_manager.return_item("M1")
+        self.persistence.save_state()
+        with open(TEST_CSV_PATH, 'w', newline='', encoding='utf-8') as f:
+            f.write("type,title,isbn,year,author,genre,director,file_size\n"
+                    "Book,Imported,M2,2001,A,B,,\n"
+                    "Book,Clash,M1,2001,A,B,,\n")
+        self.persistence.import_items_from_csv(str(TEST_CSV_PATH))
+        self.persistence.load_state()
+
+        snapshot = self.metrics.snapshot()
+        operations = snapshot["operations"]
+        self.assertEqual(operations["checkout_item"]["count"], 2)
+        self.assertEqual(operations["return_item"]["count"], 1)
+        for operation in ("save_state", "import_items_from_csv", "load_state"):
+            self.assertEqual(operations[operation]["count"], 1)
+            self.assertLessEqual(operations[operation]["p50_ms"], operations[operation]["max_ms"])
+        counters = snapshot["counters"]
+        state_bytes = TEST_STATE_PATH.stat().st_size
+        self.assertEqual(counters["bytes_written"], state_bytes)
+        self.assertEqual(counters["bytes_read"], state_bytes + TEST_CSV_PATH.stat().st_size)
+        self.assertEqual(counters["import_rows_imported"], 1)
+        self.assertEqual(counters["import_rows_skipped"], 1)
+
+    def test_cli_writes_metrics_file(self):
+        with mock.patch.object(PersistenceManager, "STATE_FILE", TEST_STATE_PATH):
+            cli = LibraryCLI(metrics_file=str(TEST_METRICS_PATH), seed_demo=False)
+            cli.catalog.add_item(DVD("Metric DVD", "MD1", 2020, "Director"))
+            cli.run_batch(["checkout MD1 Metric Clerk", "return MD1"], io.StringIO())
+        with open(TEST_METRICS_PATH, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot["operations"]["checkout_many"]["count"], 1)
+        self.assertEqual(snapshot["operations"]["load_state"]["count"], 1)
+        self.assertGreater(snapshot["counters"]["bytes_written"], 0)
+
+
+
+class TestWorkload(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = LibraryCatalog()
+        self.catalog.add_many(Book(f"Title {i}", f"W{i}", 2000, "Author", "Fiction") for i in range(200))
+        self.clock = SimulatedClock(date(2030, 1, 1))
+        self.loan_manager = LoanManager(self.catalog, clock=self.clock)
+
+    def test_due_dates_follow_the_injected_clock(self):
+        self.loan_manager.checkout_item("ClockUser", "W1")
+        self.assertEqual(self.loan_manager.get_current_checkouts()["W1"]["due_date"], date(2030, 1, 15))
+        self.clock.advance(10)
+        results = self.loan_manager.checkout_many([("ClockUser", "W2")])
+        self.assertEqual(results[0]["due_date"], date(2030, 1, 25))
+        self.assertEqual(self.loan_manager.overdue(), [])
+        self.clock.advance(10)
+        self.assertEqual(self.loan_manager.overdue(), ["W1"])
+
+    def test_zipf_workload_is_skewed_and_repeatable(self):
+        isbns = [f"W{i}" for i in range(200)]
+        skewed = Counter(isbn for _, _, isbn, _ in iter_workload(isbns, 10, 100, 50, skew=1.2, seed=7))
+        uniform = Counter(isbn for _, _, isbn, _ in iter_workload(isbns, 10, 100, 50, skew=0.0, seed=7))
+        self.assertGreater(skewed.most_common(1)[0][1], 0.15 * 1000)
+        self.assertLess(uniform.most_common(1)[0][1], 0.05 * 1000)
+        self.assertEqual(list(iter_workload(isbns, 3, 10, 5, seed=7)), list(iter_workload(isbns, 3, 10, 5, seed=7)))
+
+    def test_replay_runs_simulated_days(self):
+        result = replay(self.loan_manager, self.clock,
+                        iter_workload([f"W{i}" for i in range(200)], 60, 20, 30, skew=1.0, return_days=10, seed=3),
+                        window_days=30)
+        totals = result["totals"]
+        self.assertEqual(self.clock.today, date(2030, 1, 1) + timedelta(days=59))
+        self.assertEqual(totals["operations"], 60 * 20 + totals["returns"])
+        self.assertEqual(totals["checkouts"] + totals["unavailable"], 60 * 20)
+        self.assertEqual(totals["checkouts"] - totals["returns"], len(self.loan_manager.get_current_checkouts()))
+        self.assertGreater(totals["unavailable"], 0)
+        self.assertEqual([window["day"] for window in result["windows"]], [30, 60])
+        self.assertIsNone(self.loan_manager.metrics)
+        with self.assertRaises(ValueError):
+            replay(LoanManager(self.catalog), self.clock, iter([]))
+
+
+class TestBenchmarkBaseline(unittest.TestCase):
+
+    @staticmethod
+    def _results(checkout_ms: float, save_ms: float, seed: int = 0, samples: int = 100) -> dict:
+        return {"version": SUITE_VERSION, "seed": seed, "samples": samples,
+                "sizes": {"1000": {"operations": {"checkout_item": {"mean_ms": checkout_ms},
+                                                  "save_state": {"mean_ms": save_ms}}}}}
+
+    def test_regression_beyond_threshold_is_reported(self):
+        baseline = self._results(checkout_ms=0.010, save_ms=5.0)
+        regressions = compare_to_baseline(self._results(checkout_ms=0.015, save_ms=5.5), baseline, 0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("checkout_item at 1,000 items", regressions[0])
+        self.assertIn("+50%", regressions[0])
+
+    def test_run_within_threshold_passes(self):
+        baseline = self._results(checkout_ms=0.010, save_ms=5.0)
+        self.assertEqual(compare_to_baseline(self._results(checkout_ms=0.0119, save_ms=4.0), baseline, 0.2), [])
+
+    def test_different_settings_are_not_comparable(self):
+        baseline = self._results(checkout_ms=0.010, save_ms=5.0)
+        for changed in (self._results(0.010, 5.0, seed=1), self._results(0.010, 5.0, samples=50)):
+            with self.assertRaisesRegex(ValueError, "not comparable"):
+                compare_to_baseline(changed, baseline, 0.2)
+        with self.assertRaisesRegex(ValueError, "version"):
+            compare_to_baseline(self._results(0.010, 5.0), dict(baseline, version=SUITE_VERSION - 1), 0.2)
+
+
+
 # Run the tests
 if __name__ == '__main__':
 
@@ -0,0 +1,143 @@
+"""Synthetic circulation workloads, replayed against a LoanManager on a simulated clock.
+
+Demand for items follows a Zipf distribution: the item of popularity rank k
+is asked for in proportion to 1 / k ** skew, so a few bestsellers get most
+of the checkout attempts. Each simulated day brings a fixed number of
+checkout attempts from random patrons; every loan is kept for a random
+number of days (exponential around a mean) and then returned, late or not.
+
+The LoanManager is given a SimulatedClock, so due dates and late fees follow
+simulated days and a year of activity replays in seconds.
+"""
+import bisect
+import itertools
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from library_model import LoanManager
+from metrics import Metrics
+
+
+class SimulatedClock:
+    """A clock for LoanManager(clock=...) that only moves when advanced."""
+
+    def __init__(self, start: date):
+        self.today = start
+
+    def __call__(self) -> date:
+        return self.today
+
+    def advance(self, days: int = 1):
+        self.today += timedelta(days=days)
+
+
+class ZipfSampler:
+    """Draws indexes 0..n-1 with P(k) proportional to 1 / (k + 1) ** skew."""
+
+    def __init__(self, n: int, skew: float, rng: random.Random):
+        if n < 1:
+            raise ValueError("A Zipf sampler needs at least one item.")
+        if skew < 0:
+            raise ValueError("Zipf skew cannot be negative.")
+        self._cumulative = list(itertools.accumulate((k + 1) ** -skew for k in range(n)))
+        self._rng = rng
+
+    def sample(self) -> int:
+        return bisect.bisect_left(self._cumulative, self._rng.random() * self._cumulative[-1])
+
+
+def iter_workload(isbns: Sequence[str], days: int, checkouts_per_day: int, patrons: int,
+                  skew: float = 1.0, return_days: float = 14.0,
+                  seed: int = 0) -> Iterator[Tuple[int, str, str, int]]:
+    """
+    Yields (day, patron, isbn, keep_days) checkout attempts, day by day.
+
+    Popularity ranks are assigned to `isbns` in a seeded random order. The
+    same arguments always give the same workload.
+    """
+    rng = random.Random(seed)
+    ranked = list(isbns)
+    rng.shuffle(ranked)
+    sampler = ZipfSampler(len(ranked), skew, rng)
+    for day in range(days):
+        for _ in range(checkouts_per_day):
+            keep_days = round(rng.expovariate(1 / return_days)) if return_days > 0 else 0
+            yield day, f"Patron {rng.randrange(patrons)}", ranked[sampler.sample()], keep_days
+
+
+def replay(loan_manager: LoanManager, clock: SimulatedClock, workload: Iterator[Tuple[int, str, str, int]],
+           window_days: int = 30, fee_per_day: float = 0.50) -> Dict[str, Any]:
+    """
+    Drives `loan_manager`, which must use `clock`, through a workload from iter_workload.
+
+    Each simulated day starts with the returns due that day, with days_late
+    measured against the loan's due date, followed by that day's checkout
+    attempts. An attempt on an item already on loan counts as unavailable.
+
+    Returns the totals (operations, sustained operations per second of wall
+    time, checkouts, unavailable attempts, returns, late returns and fees)
+    and, for every `window_days`, the loans active at its end and its
+    checkout and return latencies, which show how latency changes as the
+    loan state grows.
+    """
+    if loan_manager.clock is not clock:
+        raise ValueError("The LoanManager must use the replay's clock.")
+    checkouts = loan_manager.get_current_checkouts()
+    saved_metrics = loan_manager.metrics
+    metrics = loan_manager.metrics = Metrics()
+    totals = {"operations": 0, "checkouts": 0, "unavailable": 0, "returns": 0, "late_returns": 0, "fees": 0.0}
+    windows: List[Dict[str, Any]] = []
+    due_back: Dict[int, List[str]] = {}  # simulated day -> ISBNs returned that day
+    day = 0
+
+    def close_window(days_elapsed: int):
+        operations = metrics.snapshot()["operations"]
+        window = {"day": days_elapsed, "active_loans": len(checkouts)}
+        for name, operation in (("checkout", "checkout_item"), ("return", "return_item")):
+            summary = operations.get(operation, {})
+            window[f"{name}s"] = summary.get("count", 0)
+            window[f"{name}_p50_ms"] = summary.get("p50_ms", 0.0)
+            window[f"{name}_p99_ms"] = summary.get("p99_ms", 0.0)
+        windows.append(window)
+        metrics.reset()
+
+    def next_day():
+        nonlocal day
+        clock.advance()
+        day += 1
+        if day % window_days == 0:
+            close_window(day)
+        for isbn in due_back.pop(day, ()):
+            days_late = max((clock.today - checkouts[isbn]["due_date"]).days, 0)
+            loan_manager.return_item(isbn, days_late=days_late, fee_per_day=fee_per_day)
+            totals["operations"] += 1
+            totals["returns"] += 1
+            if days_late:
+                totals["late_returns"] += 1
+                totals["fees"] += days_late * fee_per_day
+
+    start = time.perf_counter()
+    try:
+        for event_day, patron, isbn, keep_days in workload:
+            while day < event_day:
+                next_day()
+            was_on_loan = isbn in checkouts
+            loan_manager.checkout_item(patron, isbn)
+            totals["operations"] += 1
+            if was_on_loan or isbn not in checkouts:
+                totals["unavailable"] += 1
+                continue
+            totals["checkouts"] += 1
+            due_back.setdefault(day + max(keep_days, 1), []).append(isbn)
+        seconds = time.perf_counter() - start
+        if metrics.snapshot()["operations"]:
+            close_window(day + 1)
+    finally:
+        loan_manager.metrics = saved_metrics
+
+    totals["days"] = day + 1
+    totals["seconds"] = seconds
+    totals["ops_per_second"] = totals["operations"] / seconds if seconds else 0.0
+    return {"totals": totals, "windows": windows}